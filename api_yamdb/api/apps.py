@@ -1,5 +1,31 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends whose entries are not seen by other processes.
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache():
+    """
+    Idempotency keys, throttle buckets and lookup versions only work
+    across workers if the default cache is shared between them.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.SHARED_CACHE_REQUIRED and backend in LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            f'SHARED_CACHE_REQUIRED is set, but the default cache '
+            f'{backend} is local to the process. Set CACHE_BACKEND and '
+            f'CACHE_LOCATION to a shared cache.'
+        )
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        check_shared_cache()
+        from . import signals  # noqa: F401
@@ -0,0 +1,116 @@
+"""
+In-process title autocomplete.
+
+Each process keeps titles in a list sorted by normalized name, so a
+prefix is a bisect range. Matches are ranked by review count. The index
+is loaded once and then follows the change feed: titles changed since
+the last refresh and tombstones of deleted titles, at most once per
+AUTOCOMPLETE_REFRESH seconds. Review counters touch their title, so
+ranks follow too. Short prefixes match many titles, their top matches
+are kept until the index changes.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from reviews.models import Title, Tombstone
+
+# Prefix ranges longer than this keep their top matches.
+MEMO_RANGE = 500
+
+
+def normalize(name):
+    return ' '.join(name.casefold().replace('ё', 'е').split())
+
+
+class TitleIndex:
+    """Sorted ``(key, id)`` pairs and ``id -> (key, name, reviews)``."""
+
+    def __init__(self):
+        self.mutex = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.mutex:
+            self.keys = []
+            self.titles = {}
+            self.top = {}
+            self.synced_at = None
+            self.checked_at = 0
+
+    def put(self, pk, name, review_count):
+        key = normalize(name)
+        if self.titles.get(pk) == (key, name, review_count):
+            return
+        self.remove(pk)
+        insort(self.keys, (key, pk))
+        self.titles[pk] = (key, name, review_count)
+        self.top.clear()
+
+    def remove(self, pk):
+        if pk not in self.titles:
+            return
+        item = (self.titles.pop(pk)[0], pk)
+        del self.keys[bisect_left(self.keys, item)]
+        self.top.clear()
+
+    def rank(self, start, end, limit):
+        return heapq.nsmallest(
+            limit, self.keys[start:end],
+            key=lambda item: (-self.titles[item[1]][2], item),
+        )
+
+    def refresh(self):
+        """Applies title changes committed since the last refresh."""
+        if time.monotonic() - self.checked_at < settings.AUTOCOMPLETE_REFRESH:
+            return
+        with self.mutex:
+            self.checked_at = time.monotonic()
+            now = timezone.now()
+            titles = Title.objects.order_by()
+            if self.synced_at is not None:
+                # Late commits may carry earlier timestamps, the window
+                # overlaps the previous one like the change feed does.
+                since = self.synced_at - timedelta(
+                    seconds=settings.CHANGE_FEED_LAG,
+                )
+                titles = titles.filter(updated_at__gte=since)
+                for pk in Tombstone.objects.filter(
+                    entity='title', updated_at__gte=since,
+                ).values_list('object_id', flat=True):
+                    self.remove(pk)
+            for pk, name, review_count in titles.values_list(
+                'pk', 'name', 'review_count',
+            ).iterator():
+                self.put(pk, name, review_count)
+            self.synced_at = now
+
+    def search(self, query, limit):
+        """Up to ``limit`` most reviewed titles starting with ``query``."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.refresh()
+        with self.mutex:
+            start = bisect_left(self.keys, (prefix,))
+            end = bisect_left(self.keys, (prefix + '\uffff',))
+            if end - start <= MEMO_RANGE:
+                matches = self.rank(start, end, limit)
+            else:
+                if prefix not in self.top:
+                    self.top[prefix] = self.rank(
+                        start, end, settings.AUTOCOMPLETE_MAX_LIMIT,
+                    )
+                matches = self.top[prefix][:limit]
+            return [
+                {'id': pk, 'name': self.titles[pk][1],
+                 'review_count': self.titles[pk][2]}
+                for _, pk in matches
+            ]
+
+
+index = TitleIndex()
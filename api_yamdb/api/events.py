@@ -0,0 +1,247 @@
+"""
+Server-Sent Events for new reviews and comments on a title.
+
+Events are published after commit to a broker. The in-memory broker
+fans out within one process, the PostgreSQL broker sends NOTIFY on
+publish and bridges LISTEN into the event loop of ASGI processes, so
+writes handled by any worker reach every stream. Streams are plain ASGI
+coroutines: an idle connection costs a queue, not a thread.
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from reviews.models import Review, Title
+
+from .fast_serializers import to_datetime
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'yamdb_events'
+# NOTIFY payloads are limited to 8000 bytes.
+MAX_NOTIFY_PAYLOAD = 7900
+EVENTS_PATH = re.compile(r'^/api/v1/titles/(?P<title_id>\d+)/events/$')
+
+
+class InMemoryBroker:
+    """Fans events out to subscribers of this process."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.mutex = threading.Lock()
+
+    def subscribe(self, title_id):
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        subscriber = (asyncio.get_event_loop(), queue)
+        with self.mutex:
+            self.subscribers.setdefault(title_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, title_id, subscriber):
+        with self.mutex:
+            subscribers = self.subscribers.get(title_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self.subscribers.pop(title_id, None)
+
+    def dispatch(self, event):
+        """Puts event into queues of its title, from any thread."""
+        with self.mutex:
+            subscribers = tuple(self.subscribers.get(event['title'], ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self.put, queue, event)
+
+    @staticmethod
+    def put(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow clients lose events instead of growing memory.
+            logger.info('Event queue is full, dropping event')
+
+    def publish(self, event):
+        self.dispatch(event)
+
+    def ensure_listener(self, loop):
+        """Restores the source of remote events, called on heartbeats."""
+
+
+class PostgresBroker(InMemoryBroker):
+    """
+    Publishes with NOTIFY. Subscribing processes keep one LISTEN
+    connection, read from the event loop without a thread. A lost
+    connection is reopened right away and, if that fails, on heartbeats
+    of open streams. Events sent while it is down are lost.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+
+    def subscribe(self, title_id):
+        subscriber = super().subscribe(title_id)
+        if self.listener is None:
+            self.listen(subscriber[0])
+        return subscriber
+
+    def listen(self, loop):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        database = settings.DATABASES['default']
+        listener = psycopg2.connect(
+            dbname=database['NAME'], user=database['USER'],
+            password=database['PASSWORD'], host=database['HOST'],
+            port=database['PORT'],
+        )
+        listener.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with listener.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        loop.add_reader(listener.fileno(), self.poll, loop)
+        self.listener = listener
+
+    def poll(self, loop):
+        try:
+            self.listener.poll()
+        except Exception:
+            logger.exception('LISTEN connection lost')
+            loop.remove_reader(self.listener.fileno())
+            self.listener.close()
+            self.listener = None
+            self.ensure_listener(loop)
+            return
+        while self.listener.notifies:
+            notify = self.listener.notifies.pop(0)
+            self.dispatch(json.loads(notify.payload))
+
+    def ensure_listener(self, loop):
+        if self.listener is not None or not self.subscribers:
+            return
+        try:
+            self.listen(loop)
+        except Exception:
+            logger.exception('Cannot reopen LISTEN connection')
+            return
+        logger.warning('LISTEN connection reopened')
+
+    def publish(self, event):
+        payload = json.dumps(event)
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+            # Clients fetch long texts from the API by id.
+            payload = json.dumps({**event, 'text': None})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', (CHANNEL, payload))
+
+
+def get_broker():
+    if settings.EVENTS_BROKER == 'postgres':
+        return PostgresBroker()
+    return InMemoryBroker()
+
+
+broker = get_broker()
+
+
+def make_event(instance):
+    """Builds event for new review or comment."""
+    if isinstance(instance, Review):
+        event = {
+            'type': 'review',
+            'title': instance.title_id,
+            'score': instance.score,
+        }
+    else:
+        event = {
+            'type': 'comment',
+            'title': Review.objects.values_list(
+                'title_id', flat=True,
+            ).get(pk=instance.review_id_id),
+            'review': instance.review_id_id,
+        }
+    event.update(
+        id=instance.pk,
+        text=instance.text,
+        author=instance.author.username,
+        pub_date=to_datetime(instance.pub_date),
+    )
+    return event
+
+
+def publish_created(instance):
+    """Publishes event once the transaction commits."""
+    transaction.on_commit(lambda: broker.publish(make_event(instance)))
+
+
+def format_event(event):
+    return (
+        f'event: {event["type"]}\n'
+        f'id: {event["type"]}-{event["id"]}\n'
+        f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
+    ).encode()
+
+
+async def send_404(send):
+    await send({
+        'type': 'http.response.start',
+        'status': 404,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': b'{"detail":"Not found."}',
+    })
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def title_events(scope, receive, send, title_id):
+    """ASGI app streaming events of one title until client disconnects."""
+    title_id = int(title_id)
+    exists = await sync_to_async(
+        Title.objects.filter(pk=title_id).exists,
+    )()
+    if not exists:
+        await send_404(send)
+        return
+    subscriber = broker.subscribe(title_id)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': stream\n\n',
+                    'more_body': True})
+        while not disconnect.done():
+            getter = asyncio.ensure_future(subscriber[1].get())
+            done, _ = await asyncio.wait(
+                {getter, disconnect}, timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                body = format_event(getter.result())
+            else:
+                getter.cancel()
+                if disconnect.done():
+                    break
+                # Keeps proxies from closing idle connections.
+                body = b': ping\n\n'
+                broker.ensure_listener(asyncio.get_event_loop())
+            await send({'type': 'http.response.body', 'body': body,
+                        'more_body': True})
+    finally:
+        disconnect.cancel()
+        broker.unsubscribe(title_id, subscriber)
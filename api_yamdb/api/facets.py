@@ -0,0 +1,91 @@
+"""
+Genre, category and year counts of titles for the browse filters.
+
+Each facet is counted with one grouped query under all filters except
+its own, so picking a genre still shows counts of the other genres.
+Results are cached per filter combination for FACETS_CACHE_TIMEOUT
+seconds. Catalog changes switch to a new cache version, ratings moved
+by reviews only refresh by timeout.
+"""
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django_filters.utils import translate_validation
+from reviews.models import Title
+
+from . import lookups
+from .filters import TitlesFilter
+
+VERSION_KEY = 'facets:version'
+# Filters a facet ignores when counting itself.
+OWN_FILTERS = {
+    'genre': ('genre',),
+    'category': ('category',),
+    'year': ('year', 'year_min', 'year_max'),
+}
+
+
+def invalidate_facets():
+    """Makes cached facets of all filter combinations stale."""
+    # A random token, incr() raises when the cache lost the key.
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def filter_titles(params):
+    filterset = TitlesFilter(params, queryset=Title.objects.order_by())
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    return filterset.qs
+
+
+def count_facets(params):
+    """Three grouped queries, one per facet."""
+    def without(facet):
+        return filter_titles({
+            name: value for name, value in params.items()
+            if name not in OWN_FILTERS[facet]
+        })
+
+    genres = Title.genre.through.objects.filter(
+        title_id__in=without('genre').values('pk'),
+    ).values_list('genres_id').annotate(count=Count('title_id'))
+    categories = without('category').filter(
+        category__isnull=False,
+    ).values_list('category_id').annotate(count=Count('pk'))
+    years = without('year').values('year').annotate(
+        count=Count('pk'),
+    ).order_by('-year')
+    return {
+        'genre': get_counts(lookups.genres, genres),
+        'category': get_counts(lookups.categories, categories),
+        'year': list(years),
+    }
+
+
+def get_counts(table, rows):
+    """Labels grouped ids from the slug table, most titles first."""
+    counts = []
+    for pk, count in rows:
+        slug, name = table.get_slug(pk) or (None, None)
+        counts.append({'slug': slug, 'name': name, 'count': count})
+    return sorted(counts, key=lambda item: (-item['count'],
+                                            item['slug'] or ''))
+
+
+def get_facets(query_params):
+    """Facet counts for TitlesFilter params, cached."""
+    params = {
+        name: query_params[name] for name in TitlesFilter.base_filters
+        if name != 'ordering' and query_params.get(name)
+    }
+    digest = hashlib.sha1(urlencode(sorted(params.items())).encode())
+    key = f'facets:{cache.get(VERSION_KEY, 0)}:{digest.hexdigest()}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(params)
+        cache.set(key, facets, timeout=settings.FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,21 @@
+"""Sparse fieldsets: ``?fields=`` and ``?expand=`` query parameters."""
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def get_query_list(request, param):
+    """
+    Returns set of comma separated values of query param
+    or None if param is not given.
+    """
+    if request is None or param not in request.query_params:
+        return None
+    return {
+        value.strip() for value in request.query_params[param].split(',')
+        if value.strip()
+    }
+
+
+def is_requested(name, values):
+    """Checks if name is listed, None means every name is listed."""
+    return values is None or name in values
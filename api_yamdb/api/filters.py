@@ -1,14 +1,69 @@
+from django.db.models import Exists, F, OuterRef
 from django_filters import rest_framework as filters
 from reviews.models import Title
 
+from . import lookups
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Comma-separated values, a single value still works."""
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    Ordering with ``pk`` as the last key, so pages do not repeat or skip
+    rows with equal values. Fields in ``nulls_last`` put empty values
+    last in both directions.
+    """
+
+    def __init__(self, *args, nulls_last=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nulls_last = nulls_last
+
+    def get_ordering_value(self, param):
+        value = super().get_ordering_value(param)
+        field = value.lstrip('-')
+        if field not in self.nulls_last:
+            return value
+        if value.startswith('-'):
+            return F(field).desc(nulls_last=True)
+        return F(field).asc(nulls_last=True)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        return qs.order_by(*ordering, 'pk')
+
 
 class TitlesFilter(filters.FilterSet):
     name = filters.CharFilter(field_name='name', lookup_expr='icontains')
-    category = filters.CharFilter(field_name='category__slug',
-                                  lookup_expr='exact')
-    genre = filters.CharFilter(field_name='genre__slug', lookup_expr='exact')
+    category = CharInFilter(method='filter_category')
+    genre = CharInFilter(method='filter_genre')
     year = filters.NumberFilter(field_name='year', lookup_expr='exact')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating', lookup_expr='lte')
+    ordering = StableOrderingFilter(
+        fields=('name', 'year', 'rating', 'review_count'),
+        nulls_last=('rating',),
+    )
 
     class Meta:
         model = Title
         fields = ('name', 'category', 'genre', 'year')
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(
+            category_id__in=lookups.categories.get_ids(value),
+        )
+
+    def filter_genre(self, queryset, name, value):
+        """Titles with any of the genres, EXISTS keeps rows unique."""
+        return queryset.annotate(has_genre=Exists(
+            Title.genre.through.objects.filter(
+                title_id=OuterRef('pk'),
+                genres_id__in=lookups.genres.get_ids(value),
+            ),
+        )).filter(has_genre=True)
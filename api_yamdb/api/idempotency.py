@@ -0,0 +1,83 @@
+"""
+Idempotency-Key support for unsafe requests.
+
+The first request with a key stores a fingerprint of its payload and,
+once handled, its response for IDEMPOTENCY_KEY_TTL seconds. Retries
+with the same key get the stored response. Concurrent duplicates are
+rejected while the first request is still being handled.
+
+Keys live in the default cache. Retries reach any worker, so the cache
+must be shared between them (SHARED_CACHE_REQUIRED). If a key can be
+neither stored nor read, the cache is down and requests are handled
+without replay.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY = 'idempotency:{digest}'
+
+
+class IdempotencyConflict(APIException):
+    """Request with the same key is still in progress."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запрос с этим Idempotency-Key ещё выполняется.'
+
+
+class IdempotencyKeyReused(APIException):
+    """Key was already used for a different payload."""
+
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Idempotency-Key уже использован с другими данными.'
+
+
+def get_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def get_key(request, idempotency_key):
+    source = '\n'.join((
+        str(request.user.pk), request.method, request.path, idempotency_key,
+    ))
+    return KEY.format(digest=hashlib.sha1(source.encode()).hexdigest())
+
+
+def handle_idempotent(request, handler, *args, **kwargs):
+    """Calls handler once per Idempotency-Key, replays later calls."""
+    idempotency_key = request.META.get(HEADER)
+    if not idempotency_key:
+        return handler(request, *args, **kwargs)
+    key = get_key(request, idempotency_key)
+    fingerprint = get_fingerprint(request)
+    if cache.add(key, {'fingerprint': fingerprint, 'status': None},
+                 timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            cache.delete(key)
+            raise
+        cache.set(key, {
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+        }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+        return response
+    stored = cache.get(key)
+    if stored is None:
+        # Neither stored nor readable: the cache is unavailable, and a
+        # request without replay beats rejecting every write.
+        return handler(request, *args, **kwargs)
+    if stored['fingerprint'] != fingerprint:
+        raise IdempotencyKeyReused()
+    if stored['status'] is None:
+        raise IdempotencyConflict()
+    return Response(stored['data'], status=stored['status'],
+                    headers={'Idempotent-Replayed': 'true'})
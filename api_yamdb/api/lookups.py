@@ -0,0 +1,116 @@
+"""
+In-process slug tables of categories and genres.
+
+Both tables are tiny and rarely change, so every process keeps them in
+memory and reloads them when the version token in the shared cache
+changes. Catalog signals replace the token right away and again once
+the transaction commits, so other processes do not keep a table read
+before the commit. Tokens are random: a cleared cache never brings an
+old version back. With a process-local cache other processes never see
+new tokens, deployments set SHARED_CACHE_REQUIRED.
+
+If the version cannot be read (cache down, DummyCache), tables are
+reloaded from the database at most every UNVERSIONED_TTL seconds. Ids
+missing from a table, e.g. of rows written by bulk_create without
+signals, reload it once.
+
+Slugs are not unique in the database. A slug of several rows resolves
+like ``QuerySet.get``: lookups raise ``MultipleObjectsReturned``.
+"""
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from reviews.models import Categories, Genres
+
+UNVERSIONED_TTL = 1
+
+
+class SlugTable:
+    """``slug -> [(id, name)]`` and ``id -> (slug, name)`` of ``model``."""
+
+    def __init__(self, model):
+        self.model = model
+        self.key = f'lookups:{model._meta.model_name}:version'
+        self.mutex = threading.Lock()
+        self.version = None
+        self.loaded_at = None
+        self.by_slug = {}
+        self.by_id = {}
+
+    def get_version(self):
+        version = cache.get(self.key)
+        if version is not None:
+            return version
+        cache.add(self.key, uuid.uuid4().hex, timeout=None)
+        return cache.get(self.key)
+
+    def is_fresh(self, version):
+        if self.loaded_at is None:
+            return False
+        if version is None:
+            return time.monotonic() - self.loaded_at < UNVERSIONED_TTL
+        return version == self.version
+
+    def load(self, force=False):
+        """Reloads rows if another process changed the table."""
+        version = self.get_version()
+        if not force and self.is_fresh(version):
+            return
+        with self.mutex:
+            rows = self.model.objects.values_list('pk', 'slug', 'name')
+            by_slug = {}
+            for pk, slug, name in rows:
+                by_slug.setdefault(slug, []).append((pk, name))
+            self.by_slug = by_slug
+            self.by_id = {pk: (slug, name) for pk, slug, name in rows}
+            self.version = version
+            self.loaded_at = time.monotonic()
+
+    def get(self, slug):
+        """Returns ``(id, name)`` of ``slug`` or None."""
+        self.load()
+        rows = self.by_slug.get(slug)
+        if not rows:
+            return None
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned(
+                f'Slug {slug!r} matches {len(rows)} '
+                f'{self.model._meta.object_name} rows.'
+            )
+        return rows[0]
+
+    def get_ids(self, slugs):
+        """Ids of all rows with any of ``slugs``."""
+        self.load()
+        return [pk for slug in slugs
+                for pk, _ in self.by_slug.get(slug, ())]
+
+    def get_slug(self, pk):
+        """Returns ``(slug, name)`` of ``pk`` or None."""
+        self.load()
+        if pk not in self.by_id:
+            self.load(force=True)
+        return self.by_id.get(pk)
+
+    def get_instance(self, slug):
+        """Instance built from the table without a query, or None."""
+        row = self.get(slug)
+        if row is None:
+            return None
+        return self.model.from_db(self.model.objects.db,
+                                  ('id', 'slug', 'name'),
+                                  (row[0], slug, row[1]))
+
+    def invalidate(self):
+        cache.set(self.key, uuid.uuid4().hex, timeout=None)
+        transaction.on_commit(
+            lambda: cache.set(self.key, uuid.uuid4().hex, timeout=None),
+        )
+
+
+categories = SlugTable(Categories)
+genres = SlugTable(Genres)
+TABLES = {Categories: categories, Genres: genres}
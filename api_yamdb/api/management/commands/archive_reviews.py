@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from api.moderation import delete_rows
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from reviews.models import Comment, Review
+
+MIN_BATCH_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = ('Moves reviews and comments deleted or hidden more than '
+            'ARCHIVE_AFTER_DAYS days ago into gzipped NDJSON files. '
+            'Comments of archived reviews go with them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--output', default=settings.ARCHIVE_DIR)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--max-batch-seconds', type=float, default=0.5,
+            help='Batches taking longer are halved to keep locks short.',
+        )
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        os.makedirs(options['output'], exist_ok=True)
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(options['output'], f'{{}}-{stamp}.ndjson.gz')
+        with gzip.open(path.format('review'), 'at') as reviews:
+            with gzip.open(path.format('comment'), 'at') as comments:
+                self.files = {Review: reviews, Comment: comments}
+                review_count = self.archive(Review, cutoff)
+                comment_count = self.archive(Comment, cutoff)
+        self.stdout.write(f'Archived reviews: {review_count}, '
+                          f'comments: {comment_count}')
+
+    def archive(self, model, cutoff):
+        """Archives stale hidden rows of ``model`` in throttled batches."""
+        stale = model.objects.filter(
+            is_hidden=True, updated_at__lt=cutoff,
+        ).order_by('pk')
+        batch_size = self.options['batch_size']
+        limit = self.options['max_batch_seconds']
+        total = 0
+        while True:
+            started = time.monotonic()
+            ids = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            with transaction.atomic():
+                self.move(model, ids)
+            total += len(ids)
+            # Shrinks batches that hold locks too long, grows fast ones.
+            elapsed = time.monotonic() - started
+            if elapsed > limit:
+                batch_size = max(MIN_BATCH_SIZE, batch_size // 2)
+            elif elapsed < limit / 2:
+                batch_size = min(self.options['batch_size'], batch_size * 2)
+            time.sleep(self.options['pause'])
+
+    def move(self, model, ids):
+        """Writes rows to the archive, then deletes them."""
+        if model is Review:
+            comments = Comment.objects.filter(review_id__in=ids)
+            self.write(Comment, comments)
+            # Comments of hidden reviews are no longer counted.
+            delete_rows(Comment, list(comments.values_list('pk', flat=True)))
+        self.write(model, model.objects.filter(pk__in=ids))
+        delete_rows(model, ids)
+
+    def write(self, model, queryset):
+        archive = self.files[model]
+        for row in queryset.values().iterator():
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        # Rows are on disk before the transaction deletes them.
+        archive.flush()
@@ -0,0 +1,48 @@
+import time
+
+from api.management.synthetic import seed_catalog
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from reviews.models import Title
+
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+class Command(BaseCommand):
+    help = ('Measures size and latency of title and review list pages '
+            'per Accept-Encoding on synthetic data. Changes are rolled '
+            'back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            category = seed_catalog(options['limit'], reviews_per_title=10)
+            title = Title.objects.filter(category=category).first()
+            urls = {
+                'titles': f'/api/v1/titles/?limit={options["limit"]}',
+                'reviews': f'/api/v1/titles/{title.pk}/reviews/',
+            }
+            client = Client()
+            for label, url in urls.items():
+                for encoding in ENCODINGS:
+                    size, latency = self.measure(
+                        client, url, encoding, options['repeat'],
+                    )
+                    self.stdout.write(
+                        f'{label} {encoding}: {size} bytes, '
+                        f'{latency * 1000:.2f} ms'
+                    )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def measure(client, url, encoding, repeat):
+        client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+        latency = (time.perf_counter() - start) / repeat
+        return len(response.content), latency
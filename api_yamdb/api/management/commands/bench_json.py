@@ -0,0 +1,93 @@
+import time
+from decimal import Decimal
+
+from api.renderers import FastJSONRenderer
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+
+class Command(BaseCommand):
+    help = ('Compares render time of DRF JSONRenderer and FastJSONRenderer '
+            'on large synthetic title and review pages.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        pages = {
+            'titles': self.titles_page(rows),
+            'reviews': self.reviews_page(rows),
+        }
+        for label, page in pages.items():
+            expected = JSONRenderer().render(page)
+            with override_settings(JSON_COMPATIBILITY_MODE=True):
+                if FastJSONRenderer().render(page) != expected:
+                    raise CommandError(
+                        f'{label}: compatibility mode output differs',
+                    )
+                compatible = self.measure(repeat, FastJSONRenderer, page)
+            with override_settings(JSON_COMPATIBILITY_MODE=False):
+                fast = self.measure(repeat, FastJSONRenderer, page)
+            stdlib = self.measure(repeat, JSONRenderer, page)
+            self.stdout.write(
+                f'{label} ({len(expected)} bytes): '
+                f'stdlib {stdlib * 1000:.1f} ms, '
+                f'compatible {compatible * 1000:.1f} ms, '
+                f'fast {fast * 1000:.1f} ms'
+            )
+
+    @staticmethod
+    def titles_page(rows):
+        return {
+            'count': rows,
+            'next': None,
+            'previous': None,
+            'results': [
+                {
+                    'id': i,
+                    'name': f'Произведение {i}',
+                    'year': 2000 + i % 20,
+                    'description': 'Описание произведения' * 3,
+                    'rating': Decimal(i % 100) / 10 or None,
+                    'genre': [
+                        {'name': 'Драма', 'slug': 'drama'},
+                        {'name': 'Комедия', 'slug': 'comedy'},
+                    ],
+                    'category': {'name': 'Фильм', 'slug': 'movie'},
+                }
+                for i in range(rows)
+            ],
+        }
+
+    @staticmethod
+    def reviews_page(rows):
+        now = timezone.now()
+        return {
+            'count': rows,
+            'next': None,
+            'previous': None,
+            'results': [
+                {
+                    'id': i,
+                    'text': 'Текст отзыва ' * 20,
+                    'author': f'user{i}',
+                    'score': i % 10 + 1,
+                    'pub_date': now,
+                }
+                for i in range(rows)
+            ],
+        }
+
+    @staticmethod
+    def measure(repeat, renderer_class, data):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer_class().render(data)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
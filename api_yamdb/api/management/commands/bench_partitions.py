@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+
+from api.management.synthetic import seed_reviews
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from reviews.models import Comment, Review, Title
+from reviews.paginators import estimate_count
+from reviews.partitioning import is_partitioned
+from users.models import User
+
+
+# Not yet run at 10**8 reviews: list and insert latencies of the
+# partitioned layout are unmeasured, partitioning stays opt-in until
+# they are.
+class Command(BaseCommand):
+    help = ('Measures latency of review and comment lists and review '
+            'creation on PostgreSQL. Run it before and after '
+            'partition_reviews on the same data, --seed fills the '
+            'tables with synthetic rows first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Synthetic reviews to create, e.g. 10**8.')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Benchmark needs PostgreSQL.')
+        if options['seed']:
+            seed_reviews(options['seed'])
+        table = Review._meta.db_table
+        layout = ('partitioned' if is_partitioned(connection, table)
+                  else 'single table')
+        self.stdout.write(
+            f'{layout}: ~{estimate_count(Review.objects.all())} reviews, '
+            f'~{estimate_count(Comment.objects.all())} comments',
+        )
+        generator = random.Random(options['repeat'])
+        titles = list(Title.objects.filter(
+            review_count__gt=0,
+        ).values_list('pk', flat=True))
+        if not titles:
+            raise CommandError('No reviews, use --seed.')
+        titles = generator.sample(titles, min(len(titles),
+                                              options['repeat']))
+        review_timings, comment_timings = [], []
+        for title_id in titles:
+            elapsed, reviews = self.measure(lambda: list(Review.objects.filter(
+                title_id=title_id, is_hidden=False,
+            ).order_by('pub_date', 'id').values()[:10]))
+            review_timings.append(elapsed)
+            if not reviews:
+                continue
+            elapsed, _ = self.measure(lambda: list(Comment.objects.filter(
+                review_id=reviews[0]['id'], review_id__title_id=title_id,
+                is_hidden=False, review_id__is_hidden=False,
+            ).order_by('pub_date', 'id').values()[:10]))
+            comment_timings.append(elapsed)
+        self.report('review list', review_timings)
+        self.report('comment list', comment_timings)
+        with transaction.atomic():
+            author = User.objects.create(username='bench_partitions',
+                                         email='bench_partitions@yamdb.ru')
+            self.report('review create', [
+                self.measure(lambda: Review.objects.create(
+                    title_id=title_id, author=author, text='bench',
+                    score=generator.randint(1, 10),
+                ))[0]
+                for title_id in titles
+            ])
+            transaction.set_rollback(True)
+
+    def report(self, label, timings):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95)]
+        self.stdout.write(
+            f'{label}: p50 {statistics.median(timings) * 1000:.2f} ms, '
+            f'p95 {p95 * 1000:.2f} ms',
+        )
+
+    @staticmethod
+    def measure(func):
+        """Returns seconds taken by ``func`` and its result."""
+        start = time.perf_counter()
+        result = func()
+        return time.perf_counter() - start, result
@@ -0,0 +1,60 @@
+import time
+
+from api.fast_serializers import ReviewFastSerializer, TitleFastSerializer
+from api.management.synthetic import seed_catalog
+from api.serializers import ReviewSerializer, TitleListSerializer
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    help = ('Compares rows/sec of ModelSerializer and fast-path list '
+            'serializers on synthetic data. Changes are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_catalog(options['rows'])
+            titles = Title.objects.prefetch_related('genre').select_related(
+                'category',
+            )
+            reviews = Review.objects.select_related('author')
+            self.compare('titles', options['repeat'], titles,
+                         TitleListSerializer, TitleFastSerializer)
+            self.compare('reviews', options['repeat'], reviews,
+                         ReviewSerializer, ReviewFastSerializer)
+            transaction.set_rollback(True)
+
+    def compare(self, label, repeat, queryset, serializer_class,
+                fast_serializer_class):
+        rows = queryset.count()
+        slow = self.measure(
+            repeat,
+            lambda: serializer_class(queryset.all(), many=True).data,
+        )
+        fast_serializer = fast_serializer_class()
+        fast = self.measure(
+            repeat,
+            lambda: fast_serializer.to_representation(
+                fast_serializer.get_queryset(queryset.all()),
+            ),
+        )
+        self.stdout.write(
+            f'{label}: ModelSerializer {rows / slow:.0f} rows/sec, '
+            f'fast path {rows / fast:.0f} rows/sec '
+            f'(x{slow / fast:.1f})'
+        )
+
+    @staticmethod
+    def measure(repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
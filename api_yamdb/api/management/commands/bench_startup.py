@@ -0,0 +1,28 @@
+from api.management.startup import FIRST_REQUEST, measure_startup
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Compares worker startup of settings profiles: application '
+            'import time and latency of the first request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--path', default=FIRST_REQUEST)
+        parser.add_argument(
+            '--settings-modules', nargs='+',
+            default=('api_yamdb.settings', 'api_yamdb.settings_api'),
+        )
+
+    def handle(self, *args, **options):
+        for module in options['settings_modules']:
+            runs = [measure_startup(module, options['path'])
+                    for _ in range(options['repeat'])]
+            best = min(runs, key=lambda run: (run['import_ms']
+                                              + run['first_request_ms']))
+            self.stdout.write(
+                f'{module}: import {best["import_ms"]:.0f} ms, '
+                f'first request {best["first_request_ms"]:.0f} ms, '
+                f'{best["modules"]} modules, '
+                f'heavy: {", ".join(best["heavy"]) or "none"}',
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from reviews.partitioning import (PARTITION_KEYS, get_partition_sql,
+                                  is_partitioned)
+
+
+class Command(BaseCommand):
+    help = ('Converts review and comment tables to hash partitioned '
+            'tables on PostgreSQL. Tables are locked while rows are '
+            'copied, run it in a maintenance window.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=16)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Print statements without running them.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL.')
+        # The schema editor runs all statements in one transaction.
+        with connection.schema_editor(
+            collect_sql=options['dry_run'],
+        ) as schema_editor:
+            for model, key in PARTITION_KEYS:
+                table = model._meta.db_table
+                if is_partitioned(connection, table):
+                    self.stdout.write(f'{table}: already partitioned')
+                    continue
+                for statement in get_partition_sql(
+                    schema_editor, model, key, options['partitions'],
+                ):
+                    schema_editor.execute(statement, params=None)
+                self.stdout.write(f'{table}: {options["partitions"]} '
+                                  f'partitions by {key}')
+            if options['dry_run']:
+                self.stdout.write('\n'.join(schema_editor.collected_sql))
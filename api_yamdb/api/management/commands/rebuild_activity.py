@@ -0,0 +1,50 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.models import Activity, Comment, Review
+
+
+class Command(BaseCommand):
+    help = ('Refills the activity table from reviews and comments. '
+            'Used once ACTIVITY_TABLE setting is turned on.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        reviews = Review.objects.filter(is_hidden=False).values_list(
+            'id', 'title_id', 'text', 'author_id', 'score', 'pub_date',
+        ).iterator(chunk_size=batch_size)
+        comments = Comment.objects.filter(
+            is_hidden=False, review_id__is_hidden=False,
+        ).values_list(
+            'id', 'review_id__title_id', 'review_id', 'text', 'author_id',
+            'pub_date',
+        ).iterator(chunk_size=batch_size)
+        with transaction.atomic():
+            Activity.objects.all().delete()
+            self.copy((
+                Activity(kind='review', object_id=pk, title_id=title_id,
+                         text=text, author_id=author_id, score=score,
+                         pub_date=pub_date)
+                for pk, title_id, text, author_id, score, pub_date in reviews
+            ), batch_size)
+            self.copy((
+                Activity(kind='comment', object_id=pk, title_id=title_id,
+                         review_id=review_id, text=text,
+                         author_id=author_id, pub_date=pub_date)
+                for pk, title_id, review_id, text, author_id, pub_date
+                in comments
+            ), batch_size)
+        self.stdout.write(f'Activity rows: {Activity.objects.count()}')
+
+    @staticmethod
+    def copy(activities, batch_size):
+        """Inserts without loading the whole table into memory."""
+        while True:
+            batch = list(islice(activities, batch_size))
+            if not batch:
+                return
+            Activity.objects.bulk_create(batch)
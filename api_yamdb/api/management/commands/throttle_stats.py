@@ -0,0 +1,17 @@
+from api.throttling import get_metrics
+from django.core.management.base import BaseCommand
+from rest_framework.settings import api_settings
+
+
+class Command(BaseCommand):
+    help = 'Shows allowed and rejected request counts per throttle scope.'
+
+    def handle(self, *args, **options):
+        for scope in api_settings.DEFAULT_THROTTLE_RATES:
+            metrics = get_metrics(scope)
+            total = metrics['allowed'] + metrics['rejected']
+            share = metrics['rejected'] / total if total else 0
+            self.stdout.write(
+                f'{scope}: allowed {metrics["allowed"]}, '
+                f'rejected {metrics["rejected"]} ({share:.1%})'
+            )
@@ -0,0 +1,65 @@
+"""Worker startup time of a settings profile, measured in a subprocess."""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Modules API-only workers should not load. Django and DRF import
+# parts of admin, messages and mail themselves.
+HEAVY_MODULES = (
+    'django.contrib.sessions', 'djoser', 'asyncio', 'reviews.admin',
+    'users.admin',
+)
+
+# A list page: queries, serializers, pagination and the renderer.
+FIRST_REQUEST = '/api/v1/titles/?limit=10'
+
+SCRIPT = '''
+import io
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+loaded = time.perf_counter()
+path, _, query = sys.argv[1].partition('?')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.version': (1, 0),
+    'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.multithread': False,
+    'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+statuses = []
+b''.join(application(environ, lambda status, *args: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (loaded - start) * 1000,
+    'first_request_ms': (done - loaded) * 1000,
+    'status': statuses[0],
+    'modules': len(sys.modules),
+    'heavy': sorted(set(sys.argv[2:]) & set(sys.modules)),
+}))
+'''
+
+
+def measure_startup(settings_module, path=FIRST_REQUEST, env=None):
+    """
+    Starts a fresh interpreter with ``settings_module``, loads the WSGI
+    application and serves one request to ``path``. Returns timings,
+    status and loaded modules. ``env`` overrides environment variables,
+    e.g. the database to use.
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module,
+           'LOAD_DOTENV': 'False', **(env or {})}
+    output = subprocess.run(
+        (sys.executable, '-c', SCRIPT, path, *HEAVY_MODULES),
+        cwd=settings.BASE_DIR, env=env, check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return json.loads(output)
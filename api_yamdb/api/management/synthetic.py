@@ -0,0 +1,110 @@
+"""Synthetic catalog used by benchmark commands."""
+import random
+
+from django.db import connection
+from reviews.counters import recount_titles, recount_users
+from reviews.models import Categories, Comment, Genres, Review, Title
+from users.models import User
+
+WORDS = (
+    'фильм', 'книга', 'сюжет', 'герой', 'финал', 'актёр', 'режиссёр',
+    'музыка', 'сцена', 'диалог', 'отлично', 'скучно', 'неожиданно',
+    'сильно', 'слабо', 'впечатление', 'история', 'персонаж', 'жанр',
+)
+
+
+def get_text(generator, words):
+    return ' '.join(generator.choice(WORDS) for _ in range(words))
+
+
+def seed_catalog(rows, reviews_per_title=1):
+    """
+    Creates ``rows`` titles with three genres and reviews.
+    Returns the created category, titles are filtered by it.
+    """
+    generator = random.Random(rows)
+    category = Categories.objects.create(name='bench', slug='bench')
+    Genres.objects.bulk_create(
+        Genres(name=f'bench {i}', slug=f'bench-{i}') for i in range(3)
+    )
+    genres = Genres.objects.filter(slug__startswith='bench-')
+    User.objects.bulk_create(
+        User(username=f'bench_{i}', email=f'bench_{i}@yamdb.ru')
+        for i in range(reviews_per_title)
+    )
+    authors = User.objects.filter(username__startswith='bench_')
+    Title.objects.bulk_create(
+        Title(name=f'bench {i} {get_text(generator, 3)}',
+              year=generator.randint(1950, 2020),
+              description=get_text(generator, 15)[:200],
+              category=category)
+        for i in range(rows)
+    )
+    titles = Title.objects.filter(category=category)
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genres=genre)
+        for title in titles for genre in genres
+    )
+    Review.objects.bulk_create(
+        Review(title=title, author=author, text=get_text(generator, 40),
+               score=generator.randint(1, 10))
+        for title in titles for author in authors
+    )
+    recount_titles(titles.values('id'))
+    recount_users(authors.values('id'))
+    return category
+
+
+def seed_reviews(rows, authors=1000, chunk=1000):
+    """
+    Creates ``rows // authors`` titles reviewed by each of ``authors``
+    users, with one comment per review. Rows are generated by
+    PostgreSQL in chunks of ``chunk`` titles, each chunk commits on
+    its own, so hundreds of millions of rows fit in memory and WAL.
+    """
+    category = Categories.objects.create(name='bench reviews',
+                                         slug='bench-reviews')
+    User.objects.bulk_create(
+        User(username=f'bench_reviews_{i}',
+             email=f'bench_reviews_{i}@yamdb.ru')
+        for i in range(authors)
+    )
+    author_ids = list(User.objects.filter(
+        username__startswith='bench_reviews_',
+    ).values_list('pk', flat=True))
+    Title.objects.bulk_create(
+        (Title(name=f'bench reviews {i}', year=2000, category=category)
+         for i in range(rows // authors)),
+        batch_size=chunk,
+    )
+    titles = list(Title.objects.filter(category=category).order_by(
+        'pk',
+    ).values_list('pk', flat=True))
+    quote = connection.ops.quote_name
+    review = quote(Review._meta.db_table)
+    comment = quote(Comment._meta.db_table)
+    for start in range(0, len(titles), chunk):
+        bounds = (titles[start], titles[start:start + chunk][-1])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {review} (title_id, author_id, text, score, '
+                'pub_date, is_hidden, updated_at) '
+                "SELECT t.id, u.id, 'bench review ' || t.id, "
+                '1 + (t.id + u.id) %% 10, '
+                "now() - random() * interval '1000 days', false, now() "
+                f'FROM {quote(Title._meta.db_table)} t '
+                f'CROSS JOIN {quote(User._meta.db_table)} u '
+                'WHERE t.id BETWEEN %s AND %s AND u.id = ANY(%s)',
+                (*bounds, author_ids),
+            )
+            cursor.execute(
+                f'INSERT INTO {comment} (review_id_id, author_id, text, '
+                'pub_date, is_hidden, updated_at) '
+                "SELECT r.id, r.author_id, 'bench comment', "
+                "r.pub_date + interval '1 hour', false, now() "
+                f'FROM {review} r WHERE r.title_id BETWEEN %s AND %s',
+                bounds,
+            )
+        recount_titles(titles[start:start + chunk])
+    recount_users(author_ids)
+    return category
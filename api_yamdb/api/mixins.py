@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM, get_query_list
+from .idempotency import handle_idempotent
+
+
+class FastListMixin:
+    """
+    Serves ``list`` action through ``fast_list_serializer_class``
+    when FAST_LIST_SERIALIZATION setting is on. Sparse fieldset query
+    params are passed to the fast serializer.
+    """
+
+    fast_list_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if (self.fast_list_serializer_class is None
+                or not settings.FAST_LIST_SERIALIZATION):
+            return super().list(request, *args, **kwargs)
+        serializer = self.fast_list_serializer_class(
+            fields=get_query_list(request, FIELDS_PARAM),
+            expand=get_query_list(request, EXPAND_PARAM),
+        )
+        queryset = serializer.get_queryset(
+            self.filter_queryset(self.get_queryset()),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page),
+            )
+        return Response(serializer.to_representation(queryset))
+
+
+class PublicCacheMixin:
+    """
+    Marks successful anonymous reads as publicly cacheable for
+    API_CACHE_MAX_AGE seconds, so nginx can micro-cache them.
+    Authenticated reads are private.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs,
+        )
+        if (request.method not in permissions.SAFE_METHODS
+                or response.status_code != 200):
+            return response
+        patch_vary_headers(response, ('Authorization',))
+        if not request.user.is_authenticated and settings.API_CACHE_MAX_AGE:
+            patch_cache_control(response, public=True,
+                                max_age=settings.API_CACHE_MAX_AGE)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class IdempotencyMixin:
+    """Honours Idempotency-Key header on create and partial update."""
+
+    def create(self, request, *args, **kwargs):
+        return handle_idempotent(request, super().create, *args, **kwargs)
+
+    def partial_update(self, request, *args, **kwargs):
+        return handle_idempotent(request, super().partial_update,
+                                 *args, **kwargs)
+
+
+class NestedParentMixin:
+    """
+    Filters children by parent ids from URL kwargs in a single query.
+    Parent existence is checked only for empty pages and writes, at
+    most once per request.
+
+    ``parent_lookups`` and ``child_lookups`` map lookups on the parent
+    and child models to URL kwargs, ``parent_filters`` and
+    ``child_filters`` are constant lookups.
+    """
+
+    parent_model = None
+    parent_lookups = {}
+    parent_filters = {}
+    child_model = None
+    child_lookups = {}
+    child_filters = {}
+    parent_checked = False
+
+    def get_lookups(self, lookups):
+        return {
+            lookup: self.kwargs[kwarg] for lookup, kwarg in lookups.items()
+        }
+
+    def check_parent(self):
+        """Raises Http404 if parent from URL does not exist."""
+        if self.parent_checked:
+            return
+        if not self.parent_model.objects.filter(
+            **self.parent_filters, **self.get_lookups(self.parent_lookups),
+        ).exists():
+            raise Http404
+        self.parent_checked = True
+
+    def get_queryset(self):
+        return self.child_model.objects.filter(
+            **self.child_filters, **self.get_lookups(self.child_lookups),
+        )
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and not page:
+            self.check_parent()
+        return page
@@ -0,0 +1,137 @@
+"""
+Bulk moderation of reviews and comments.
+
+Matching rows are deleted or hidden with set-based statements in
+batches, bypassing per-row signals. Tombstones and activity rows are
+written in bulk, then ratings and counters of affected titles and
+authors are recounted with one UPDATE per table.
+
+Authors delete their own reviews and comments softly: rows are hidden
+and stamped with ``deleted_at``, manage.py archive_reviews moves them
+out of the hot tables later.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from reviews.counters import (add_comment, get_commenters, recount_titles,
+                              recount_users)
+from reviews.models import Activity, Comment, Review, Tombstone
+
+from .purge import CATALOG_PATHS, purge_paths
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+TARGETS = {
+    'reviews': (Review, 'title_id'),
+    'comments': (Comment, 'review_id__title_id'),
+}
+
+
+def get_queryset(target, ids=None, username=None, title=None, text=None,
+                 since=None, until=None):
+    """Rows of ``target`` matching all given filters."""
+    model, title_lookup = TARGETS[target]
+    filters = {
+        'pk__in': ids,
+        'author__username': username,
+        title_lookup: title,
+        'text__icontains': text,
+        'pub_date__gte': since,
+        'pub_date__lt': until,
+    }
+    return model.objects.filter(**{
+        lookup: value for lookup, value in filters.items()
+        if value is not None
+    })
+
+
+def batches(items):
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def delete_rows(model, ids):
+    """Deletes rows without the collector, leaving tombstones."""
+    entity = model._meta.model_name
+    for batch in batches(ids):
+        Tombstone.objects.bulk_create(
+            Tombstone(entity=entity, object_id=pk) for pk in batch
+        )
+        Activity.objects.filter(kind=entity, object_id__in=batch).delete()
+        # No per-row signals, counters are recounted afterwards.
+        model.objects.filter(pk__in=batch)._raw_delete(model.objects.db)
+
+
+def hide_rows(model, ids):
+    entity = model._meta.model_name
+    for batch in batches(ids):
+        Activity.objects.filter(kind=entity, object_id__in=batch).delete()
+        if model is Review:
+            # Comments of hidden reviews leave the feed with them.
+            Activity.objects.filter(kind='comment',
+                                    review_id__in=batch).delete()
+        model.objects.filter(pk__in=batch).update(
+            is_hidden=True, updated_at=timezone.now(),
+        )
+
+
+def soft_delete(instance):
+    """Hides review or comment of its author until it is archived."""
+    was_hidden = instance.is_hidden
+    instance.is_hidden = True
+    instance.deleted_at = timezone.now()
+    # Signals drop the activity row and uncount the review.
+    instance.save(update_fields=('is_hidden', 'deleted_at', 'updated_at'))
+    if isinstance(instance, Comment) and not was_hidden:
+        add_comment(instance, sign=-1)
+
+
+def moderate(moderator, action, target, **filters):
+    """Deletes or hides matching rows, returns audit summary."""
+    started = time.monotonic()
+    model, title_lookup = TARGETS[target]
+    queryset = get_queryset(target, **filters)
+    if action == 'hide':
+        queryset = queryset.filter(is_hidden=False)
+    with transaction.atomic():
+        rows = list(queryset.values_list('pk', title_lookup, 'author_id'))
+        ids = [pk for pk, _, _ in rows]
+        authors = {author_id for _, _, author_id in rows}
+        titles = set()
+        comment_count = len(ids) if model is Comment else 0
+        if model is Review:
+            titles = {title_id for _, title_id, _ in rows}
+        if model is Review and action == 'delete':
+            comments = list(Comment.objects.filter(
+                review_id__in=ids,
+            ).values_list('pk', 'author_id'))
+            authors.update(author_id for _, author_id in comments)
+            comment_count = len(comments)
+            delete_rows(Comment, [pk for pk, _ in comments])
+        elif model is Review:
+            authors.update(get_commenters(ids).values_list(
+                'author_id', flat=True,
+            ))
+        if action == 'delete':
+            delete_rows(model, ids)
+        else:
+            hide_rows(model, ids)
+        recount_titles(titles)
+        recount_users(authors)
+        if titles:
+            purge_paths(CATALOG_PATHS['title'])
+    summary = {
+        'action': action,
+        'target': target,
+        'moderator': moderator.username,
+        'reviews': len(ids) if model is Review else 0,
+        'comments': comment_count,
+        'titles': len(titles),
+        'authors': len(authors),
+        'duration_ms': round((time.monotonic() - started) * 1000),
+    }
+    logger.info('Bulk moderation: %s', summary)
+    return summary
@@ -0,0 +1,257 @@
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (BasePagination, LimitOffsetPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from reviews.paginators import EstimatedCountPaginator, get_count
+
+
+class EstimatedPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination with planner estimated count above
+    ESTIMATED_COUNT_THRESHOLD, flagged by ``count_is_estimate``.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_estimate', self.page.paginator.count_is_estimate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class EstimatedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with planner estimated count above
+    ESTIMATED_COUNT_THRESHOLD, flagged by ``count_is_estimate``.
+    The next link is decided by fetching one extra row, so it does not
+    depend on the estimate.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count, self.count_is_estimate = get_count(queryset)
+        self.offset = self.get_offset(request)
+        self.request = request
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.count = max(self.count, self.offset + len(rows))
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.request.build_absolute_uri(),
+                                  self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param,
+                                   self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_is_estimate', self.count_is_estimate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages ordered by ``(ordering_field, id)`` and resumed from an opaque
+    cursor, so every page is an index range scan regardless of depth.
+    The first page may start from a timestamp in ``since_param``.
+
+    Works with model instances and ``.values()`` rows alike.
+    """
+
+    ordering_field = 'updated_at'
+    descending = False
+    cursor_param = 'cursor'
+    cursor_length = 2
+    since_param = 'updated_since'
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK['PAGE_SIZE']
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, position):
+        stamp, *rest = position
+        raw = '|'.join((stamp.isoformat(), *map(str, rest))).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor):
+        """Returns ``(timestamp, ..., id)`` of ``cursor_length`` items."""
+        try:
+            stamp, *rest, pk = base64.urlsafe_b64decode(
+                cursor.encode(),
+            ).decode().split('|')
+            position = (self.parse_stamp(stamp), *rest, int(pk))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            position = (None,)
+        if position[0] is None or len(position) != self.cursor_length:
+            raise ValidationError({self.cursor_param: ['Неверный курсор.']})
+        return position
+
+    def parse_stamp(self, value):
+        """Aware datetime or None if ``value`` is not a valid one."""
+        try:
+            # Unescaped "+" of a UTC offset arrives as a space.
+            stamp = parse_datetime(value.replace(' ', '+'))
+        except ValueError:
+            # Well formed, but out of range, like month 13.
+            return None
+        if stamp is None or timezone.is_aware(stamp):
+            return stamp
+        return timezone.make_aware(stamp, timezone.utc)
+
+    def get_position(self, request):
+        cursor = request.query_params.get(self.cursor_param)
+        if cursor:
+            return self.decode_cursor(cursor)
+        since = request.query_params.get(self.since_param)
+        if not since:
+            return None
+        stamp = self.parse_stamp(since)
+        if stamp is None:
+            raise ValidationError({self.since_param: ['Неверная дата.']})
+        return stamp, 0
+
+    def get_row_position(self, row):
+        if isinstance(row, dict):
+            return row[self.ordering_field], row['id']
+        return getattr(row, self.ordering_field), row.pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.position = self.get_position(request)
+        field = self.ordering_field
+        if self.descending:
+            queryset = queryset.order_by(f'-{field}', '-id')
+        else:
+            queryset = queryset.order_by(field, 'id')
+        if self.position is not None:
+            stamp, pk = self.position
+            after = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{after}': stamp})
+                | Q(**{field: stamp, f'id__{after}': pk}),
+            )
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if rows:
+            self.position = self.get_row_position(rows[-1])
+        return rows
+
+    def get_cursor(self):
+        if self.position is None:
+            return None
+        return self.encode_cursor(self.position)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.since_param)
+        return replace_query_param(url, self.cursor_param, self.get_cursor())
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'cursor': self.get_cursor(),
+            'results': data,
+        })
+
+
+class ChangeFeedPagination(KeysetPagination):
+    """
+    Change feed pages. Rows changed within the last CHANGE_FEED_LAG
+    seconds are held back, so transactions committing slightly out of
+    order are not skipped by a cursor that has already moved past them.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = queryset.filter(
+            updated_at__lte=timezone.now() - timedelta(
+                seconds=settings.CHANGE_FEED_LAG,
+            ),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class FanInKeysetPagination(KeysetPagination):
+    """
+    Newest first keyset pages merged from several sources of ``.values()``
+    rows. Each source reads at most one page past the cursor from its own
+    ``(pub_date, id)`` index, so the cost does not grow with table size.
+    Rows with equal dates are ordered by source name, then id.
+    """
+
+    ordering_field = 'pub_date'
+    descending = True
+    cursor_length = 3
+    since_param = None
+
+    def get_after(self, kind):
+        """Filter for rows of ``kind`` source after the cursor."""
+        stamp, cursor_kind, pk = self.position
+        field = self.ordering_field
+        if kind < cursor_kind:
+            return Q(**{f'{field}__lte': stamp})
+        if kind > cursor_kind:
+            return Q(**{f'{field}__lt': stamp})
+        return Q(**{f'{field}__lt': stamp}) | Q(**{field: stamp, 'id__lt': pk})
+
+    def paginate_queryset(self, sources, request, view=None):
+        """Takes dict of source name to queryset, returns (name, row) pairs."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.position = self.get_position(request)
+        field = self.ordering_field
+        rows = []
+        for kind, queryset in sources.items():
+            queryset = queryset.order_by(f'-{field}', '-id')
+            if self.position is not None:
+                queryset = queryset.filter(self.get_after(kind))
+            rows.extend((kind, row) for row in queryset[:self.page_size + 1])
+        rows.sort(key=lambda item: (item[1][field], item[0], item[1]['id']),
+                  reverse=True)
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if rows:
+            kind, row = rows[-1]
+            self.position = row[field], kind, row['id']
+        return rows
+
+
+class ActivityPagination(KeysetPagination):
+    """Newest first pages of the activity table or reviews of one author."""
+
+    ordering_field = 'pub_date'
+    descending = True
+    since_param = None
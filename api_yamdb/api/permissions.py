@@ -26,7 +26,7 @@ class IsAuthorOrReadOnlyPermission(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         if request.user.is_authenticated:
-            return (obj.author == request.user
+            return (obj.author_id == request.user.id
                     or request.user.role in ('admin', 'moderator')
                     or request.user.is_superuser)
         return False
@@ -43,3 +43,14 @@ class IsAdminUserOrReadOnly(permissions.BasePermission):
         if request.user.is_authenticated:
             return request.user.role == 'admin'
         return False
+
+
+class IsModerator(permissions.BasePermission):
+    """Custom permission for users with moderator role and above."""
+
+    message = 'Доступ только для модераторов и выше!'
+
+    def has_permission(self, request, view):
+        return (request.user.is_authenticated
+                and (request.user.role in ('admin', 'moderator')
+                     or request.user.is_superuser))
@@ -0,0 +1,61 @@
+"""
+Refreshes nginx micro-cache entries after catalog writes.
+
+Stock nginx has no purge, so entries are refreshed by requesting them
+with the X-Cache-Refresh header, which makes nginx bypass the cache and
+store the fresh response. nginx keys entries by path and normalized
+Accept-Encoding, so every encoding variant is refreshed. Other URL
+variants expire by TTL.
+"""
+import logging
+import threading
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATHS = {
+    'title': ('/api/v1/titles/',),
+    'categories': ('/api/v1/categories/', '/api/v1/titles/'),
+    'genres': ('/api/v1/genres/', '/api/v1/titles/'),
+}
+# Values of $api_encoding in the nginx config.
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def refresh(paths):
+    for path in paths:
+        for encoding in ENCODINGS:
+            request = Request(settings.CACHE_PURGE_URL + path, headers={
+                'X-Cache-Refresh': '1', 'Accept-Encoding': encoding,
+            })
+            try:
+                urlopen(request,
+                        timeout=settings.CACHE_PURGE_TIMEOUT).close()
+            except (URLError, OSError) as error:
+                logger.warning('Cache refresh of %s (%s) failed: %s',
+                               path, encoding, error)
+
+
+def purge_paths(paths):
+    """Refreshes paths in background once the transaction commits."""
+    if not settings.CACHE_PURGE_URL:
+        return
+    paths = tuple(paths)
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=refresh, args=(paths,), daemon=True,
+        ).start()
+    )
+
+
+def purge_instance(instance):
+    """Refreshes list pages and detail page of a catalog object."""
+    model_name = instance._meta.model_name
+    paths = CATALOG_PATHS[model_name]
+    if model_name == 'title':
+        paths += (f'/api/v1/titles/{instance.pk}/',)
+    purge_paths(paths)
@@ -0,0 +1,82 @@
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson writes floats outside of this range as 1e16 or 0.00001 where
+# repr() gives 1e+16 or 1e-05, and writes NaN and Infinity as null.
+FLOAT_RANGE = (1e-4, 1e16)
+# UTF-8 encoded U+2028 and U+2029, escaped by DRF JSONRenderer.
+LINE_SEPARATORS = re.compile(b'\xe2\x80([\xa8\xa9])')
+ESCAPED_SEPARATORS = {b'\xa8': b'\\u2028', b'\xa9': b'\\u2029'}
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer backed by orjson with stdlib json fallback.
+
+    With JSON_COMPATIBILITY_MODE setting on output is byte-identical
+    to rest_framework.renderers.JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        compatible = settings.JSON_COMPATIBILITY_MODE
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=self.get_options(compatible),
+            )
+        except TypeError:
+            # Integers above 64 bit and types orjson cannot handle.
+            return super().render(data, accepted_media_type, renderer_context)
+        if compatible:
+            if has_unsafe_floats(data):
+                # Stdlib json also raises ValueError on NaN and Infinity.
+                return super().render(
+                    data, accepted_media_type, renderer_context,
+                )
+            ret = LINE_SEPARATORS.sub(
+                lambda match: ESCAPED_SEPARATORS[match.group(1)], ret,
+            )
+        return ret
+
+    @staticmethod
+    def get_options(compatible):
+        """Returns orjson options for selected mode."""
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        if compatible:
+            # Dataclasses are not supported by the DRF encoder.
+            return options | orjson.OPT_PASSTHROUGH_DATACLASS
+        return options
+
+
+def has_unsafe_floats(data):
+    """True if orjson would write some float differently than repr()."""
+    low, high = FLOAT_RANGE
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if value is None or isinstance(value, (str, int)):
+            continue
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, (float, Decimal)):
+            value = float(value)
+            if value and not low <= abs(value) < high:
+                return True
+    return False
@@ -1,16 +1,50 @@
 import datetime as dt
 
 from django.conf import settings
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from rest_framework import serializers, status
+from rest_framework import permissions, serializers, status
 from rest_framework.exceptions import APIException
 from rest_framework.relations import SlugRelatedField
-from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
 from reviews.models import Categories, Comment, Genres, Review, Title
 from users.models import User
 from users.tokens import ConfirmationCodeTokenGenerator
 
+from . import lookups
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM, get_query_list
+
+
+class SparseFieldsetMixin:
+    """
+    Limits read output to fields listed in ?fields=. Relations from
+    ``compact_fields`` not listed in ?expand= are rendered by slug.
+    """
+
+    compact_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+        fields = get_query_list(request, FIELDS_PARAM)
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        expand = get_query_list(request, EXPAND_PARAM)
+        if expand is None:
+            return
+        for name in self.compact_fields:
+            if name in self.fields and name not in expand:
+                self.fields[name] = SlugRelatedField(
+                    slug_field='slug',
+                    read_only=True,
+                    many=isinstance(self.fields[name],
+                                    serializers.ListSerializer),
+                )
+
 
 class AdminSerializer(serializers.ModelSerializer):
     """Serializer for admin users for UserViewSet."""
@@ -26,11 +60,15 @@ class AdminSerializer(serializers.ModelSerializer):
         choices=User.ROLES_CHOICES, default=User.USER, initial=User.USER,
     )
 
+    average_score = serializers.FloatField(read_only=True)
+
     class Meta:
         model = User
         fields = (
             'username', 'email', 'first_name', 'last_name', 'bio', 'role',
+            'review_count', 'comment_count', 'average_score',
         )
+        read_only_fields = ('review_count', 'comment_count')
 
     def validate_username(self, username):
         """Checks if given username is forbidden for registration."""
@@ -140,32 +178,43 @@ class GenresSerializer(serializers.ModelSerializer):
         fields = ('count', 'name', 'slug')
 
 
-class TitleListSerializer(serializers.ModelSerializer):
+class TitleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Reading from title and subjet rating."""
     genre = GenresSerializer(many=True, read_only=True)
     category = CategoriesSerializer(read_only=True)
     count = serializers.IntegerField(read_only=True)
-    rating = serializers.SerializerMethodField()
+    rating = serializers.FloatField(read_only=True)
+
+    compact_fields = ('genre', 'category')
 
     class Meta:
         fields = ('count', 'id', 'name', 'year',
                   'description', 'rating', 'genre', 'category')
         model = Title
 
-    def get_rating(self, obj):
-        title_id = self.context.get('view').kwargs.get('pk')
-        return Review.objects.filter(title=title_id).aggregate(
-            Avg('score')).get('score__avg')
+
+class CachedSlugRelatedField(SlugRelatedField):
+    """Resolves slugs from an in-process slug table, without queries."""
+
+    def __init__(self, model=None, **kwargs):
+        # Fields are deep-copied from their kwargs, tables hold a lock.
+        self.table = lookups.TABLES[model]
+        super().__init__(slug_field='slug', queryset=model.objects.all(),
+                         **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        instance = self.table.get_instance(data)
+        if instance is None:
+            self.fail('does_not_exist', slug_name='slug', value=data)
+        return instance
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Recording in title."""
-    genre = serializers.SlugRelatedField(
-        slug_field='slug', many=True, queryset=Genres.objects.all()
-    )
-    category = serializers.SlugRelatedField(
-        slug_field='slug', queryset=Categories.objects.all()
-    )
+    genre = CachedSlugRelatedField(model=Genres, many=True)
+    category = CachedSlugRelatedField(model=Categories)
 
     class Meta:
         fields = ('id', 'name', 'year', 'description', 'genre', 'category')
@@ -178,18 +227,7 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         return value
 
 
-class CurrentTitleDefault:
-    """
-    May be applied as a `default=...` value on a serializer field.
-    Returns the title_id.
-    """
-    requires_context = True
-
-    def __call__(self, serializer_field):
-        return serializer_field.context.get('view').kwargs.get('title_id')
-
-
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for review and it is forbidden
     to leave more than one review.
@@ -198,10 +236,9 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True,
         slug_field='username',
         default=serializers.CurrentUserDefault())
-    title = serializers.HiddenField(default=CurrentTitleDefault())
 
     class Meta:
-        fields = ('id', 'title', 'text', 'author', 'score', 'pub_date')
+        fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
 
     def validate_score(self, value):
@@ -209,13 +246,26 @@ class ReviewSerializer(serializers.ModelSerializer):
             return value
         raise serializers.ValidationError('Value between 1 and 10!')
 
-    validators = (
-        UniqueTogetherValidator(
-            queryset=Review.objects.all(),
-            fields=('title', 'author'),
-            message='You can only write one review.'
-        ),
-    )
+    def create(self, validated_data):
+        """
+        Single insert, uniqueness is checked by unique_score
+        constraint instead of a SELECT before every insert.
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if Review.objects.filter(
+                title_id=validated_data['title_id'],
+                author=validated_data['author'],
+                deleted_at=None,
+            ).exists():
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        'You can only write one review.',
+                    ],
+                })
+            raise
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -227,3 +277,25 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'text', 'author', 'pub_date')
         model = Comment
+
+
+class ModerationSerializer(serializers.Serializer):
+    """Bulk moderation request: rows are selected by ids or filters."""
+
+    action = serializers.ChoiceField(choices=('delete', 'hide'))
+    target = serializers.ChoiceField(choices=('reviews', 'comments'))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+    )
+    username = serializers.CharField(required=False)
+    title = serializers.IntegerField(required=False)
+    text = serializers.CharField(required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if set(attrs) <= {'action', 'target'}:
+            raise serializers.ValidationError(
+                'Укажите ids или хотя бы один фильтр.',
+            )
+        return attrs
@@ -0,0 +1,44 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Categories, Comment, Genres, Review, Title
+
+from .facets import invalidate_facets
+from .lookups import TABLES
+from .purge import purge_instance
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Categories)
+@receiver(post_save, sender=Genres)
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Categories)
+@receiver(post_delete, sender=Genres)
+def purge_catalog(sender, instance, **kwargs):
+    purge_instance(instance)
+    invalidate_facets()
+
+
+@receiver(post_save, sender=Categories)
+@receiver(post_save, sender=Genres)
+@receiver(post_delete, sender=Categories)
+@receiver(post_delete, sender=Genres)
+def invalidate_lookups(sender, **kwargs):
+    TABLES[sender].invalidate()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def purge_title_genres(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        purge_instance(instance)
+        invalidate_facets()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def publish_event(sender, instance, created, **kwargs):
+    if created:
+        # Events pull in asyncio, imported on the first write instead
+        # of at worker start.
+        from .events import publish_created
+
+        publish_created(instance)
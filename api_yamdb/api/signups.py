@@ -0,0 +1,30 @@
+"""
+Recent signup store.
+
+Repeated signups with the same username and email within
+SIGNUP_DEDUP_WINDOW seconds get the stored response instead of a new
+confirmation code and email.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY = 'signup:{digest}'
+
+
+def get_key(username, email):
+    digest = hashlib.sha1(f'{username}\n{email}'.encode()).hexdigest()
+    return KEY.format(digest=digest)
+
+
+def get_recent_signup(username, email):
+    """Returns stored response data or None."""
+    if not username or not email:
+        return None
+    return cache.get(get_key(username, email))
+
+
+def remember_signup(username, email, data):
+    cache.set(get_key(username, email), dict(data),
+              timeout=settings.SIGNUP_DEDUP_WINDOW)
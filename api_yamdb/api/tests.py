@@ -0,0 +1,1385 @@
+import asyncio
+import datetime as dt
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from http import HTTPStatus
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import (Categories, Comment, Genres, Review, Title,
+                            Tombstone)
+from reviews.paginators import get_plan_rows
+from users.models import User
+
+from api_yamdb.asgi import application
+
+from . import autocomplete, lookups, purge
+from .apps import check_shared_cache
+from .events import PostgresBroker, broker, make_event
+from .management.startup import measure_startup
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .throttling import get_metrics, local_store
+
+UNREACHABLE_CACHE = {'default': {'BACKEND': 'api.tests.UnreachableCache'}}
+
+
+class UnreachableCache(BaseCache):
+    """Memcached with the server down: nothing is stored, nothing raises."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+    def add(self, key, value, timeout=None, version=None):
+        return False
+
+    def get(self, key, default=None, version=None):
+        return default
+
+    def set(self, key, value, timeout=None, version=None):
+        pass
+
+    def delete(self, key, version=None):
+        pass
+
+    def clear(self):
+        pass
+
+
+class FastListSerializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.reader = User.objects.create(username='reader',
+                                         email='reader@yamdb.ru')
+        category = Categories.objects.create(name='Фильм', slug='movie')
+        drama = Genres.objects.create(name='Драма', slug='drama')
+        comedy = Genres.objects.create(name='Комедия', slug='comedy')
+        cls.title = Title.objects.create(name='Титаник', year=1997,
+                                         category=category)
+        cls.title.genre.set((drama, comedy))
+        Title.objects.create(name='Без категории', year=2000)
+        cls.review = Review.objects.create(title=cls.title, text='Отлично',
+                                           author=cls.author, score=9)
+        Review.objects.create(title=cls.title, text='Так себе',
+                              author=cls.reader, score=4)
+        Comment.objects.create(review_id=cls.review, text='Согласен',
+                               author=cls.reader)
+
+    def setUp(self):
+        self.guest_client = APIClient()
+
+    def assert_same_output(self, url):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.guest_client.get(url)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.content, expected.content)
+
+    def test_titles_list_matches_model_serializer(self):
+        """Fast path отдаёт тот же JSON для произведений."""
+        self.assert_same_output('/api/v1/titles/')
+
+    def test_reviews_list_matches_model_serializer(self):
+        """Fast path отдаёт тот же JSON для отзывов."""
+        self.assert_same_output(f'/api/v1/titles/{self.title.pk}/reviews/')
+
+    def test_sparse_fieldsets_match_model_serializer(self):
+        """?fields= и ?expand= одинаково работают в обоих путях."""
+        self.assert_same_output('/api/v1/titles/?fields=id,name,rating')
+        self.assert_same_output(
+            '/api/v1/titles/?fields=name,genre,category&expand=category'
+        )
+        self.assert_same_output(
+            f'/api/v1/titles/{self.title.pk}/reviews/?fields=id,score'
+        )
+
+    def test_sparse_fieldsets_skip_unrequested_relations(self):
+        """Незапрошенные связи не загружаются."""
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                '/api/v1/titles/?fields=id,name,rating'
+            )
+        self.assertEqual(
+            response.json()['results'][1],
+            {'id': self.title.pk, 'name': 'Титаник', 'rating': 6.5},
+        )
+        response = self.guest_client.get(
+            f'/api/v1/titles/{self.title.pk}/?fields=genre&expand='
+        )
+        self.assertEqual(response.json(), {'genre': ['drama', 'comedy']})
+
+    def test_comments_list_matches_model_serializer(self):
+        """Fast path отдаёт тот же JSON для комментариев."""
+        self.assert_same_output(
+            f'/api/v1/titles/{self.title.pk}/reviews/'
+            f'{self.review.pk}/comments/'
+        )
+
+    def test_large_responses_are_compressed(self):
+        """Ответы больше порога сжимаются, меньше - нет."""
+        url = '/api/v1/titles/'
+        expected = self.guest_client.get(url).content
+        with override_settings(COMPRESSION_MIN_SIZE=len(expected) + 1):
+            response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        with override_settings(COMPRESSION_MIN_SIZE=len(expected)):
+            response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), expected)
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='author',
+                                       email='author@yamdb.ru')
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/titles/{self.title.pk}/reviews/'
+
+    def test_retry_replays_stored_response(self):
+        """Повтор с тем же ключом не создаёт второй отзыв."""
+        data = {'text': 'Отлично', 'score': 9}
+        first = self.client.post(self.url, data,
+                                 HTTP_IDEMPOTENCY_KEY='retry-1')
+        second = self.client.post(self.url, data,
+                                  HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(first.status_code, HTTPStatus.CREATED)
+        self.assertEqual(second.status_code, HTTPStatus.CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_key_reuse_with_other_payload_is_rejected(self):
+        """Ключ нельзя использовать с другими данными."""
+        self.client.post(self.url, {'text': 'Отлично', 'score': 9},
+                         HTTP_IDEMPOTENCY_KEY='retry-2')
+        response = self.client.post(self.url, {'text': 'Плохо', 'score': 2},
+                                    HTTP_IDEMPOTENCY_KEY='retry-2')
+        self.assertEqual(response.status_code,
+                         HTTPStatus.UNPROCESSABLE_ENTITY)
+
+    @override_settings(CACHES=UNREACHABLE_CACHE)
+    def test_write_without_cache_is_not_rejected(self):
+        """Без кэша запрос с ключом выполняется, но не повторяется."""
+        response = self.client.post(self.url, {'text': 'Отлично', 'score': 9},
+                                    HTTP_IDEMPOTENCY_KEY='retry-3')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_process_local_cache_is_refused_when_shared_required(self):
+        """Без общего кэша приложение с SHARED_CACHE_REQUIRED не стартует."""
+        memcached = {'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': 'memcached:11211',
+        }}
+        with self.settings(SHARED_CACHE_REQUIRED=True):
+            with self.assertRaises(ImproperlyConfigured):
+                check_shared_cache()
+            with self.settings(CACHES=memcached):
+                check_shared_cache()
+
+
+class ReviewCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='author',
+                                       email='author@yamdb.ru')
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/v1/titles/{self.title.pk}/reviews/'
+
+    def test_review_is_created_with_existence_check_and_insert(self):
+        """
+        Создание отзыва - одна проверка произведения, один INSERT,
+        отметка произведения для ленты изменений и счётчик автора.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {'text': 'Ок', 'score': 7})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        # Savepoints only appear because the test runs in a transaction.
+        queries = [query['sql'] for query in context.captured_queries
+                   if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(queries), 4, queries)
+
+    def test_second_review_returns_same_error(self):
+        """Повторный отзыв отклоняется ограничением unique_score."""
+        self.client.post(self.url, {'text': 'Ок', 'score': 7})
+        response = self.client.post(self.url, {'text': 'Ещё', 'score': 3})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'non_field_errors': ['You can only write one review.'],
+        })
+
+    def test_review_for_missing_title_returns_404(self):
+        response = self.client.post('/api/v1/titles/0/reviews/',
+                                    {'text': 'Ок', 'score': 7})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class NestedRouteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='author',
+                                       email='author@yamdb.ru')
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+        cls.review = Review.objects.create(title=cls.title, text='Ок',
+                                           author=cls.user, score=7)
+        cls.comments_url = (f'/api/v1/titles/{cls.title.pk}/reviews/'
+                            f'{cls.review.pk}/comments/')
+
+    def setUp(self):
+        self.guest_client = APIClient()
+
+    def test_comments_are_listed_without_parent_lookup(self):
+        """Непустая страница - без отдельного запроса отзыва."""
+        Comment.objects.create(review_id=self.review, text='Да',
+                               author=self.user)
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(self.comments_url)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_missing_parent_returns_404(self):
+        """Несуществующий отзыв или чужое произведение дают 404."""
+        other = Title.objects.create(name='Другое', year=2000)
+        urls = (
+            f'/api/v1/titles/{self.title.pk}/reviews/0/comments/',
+            f'/api/v1/titles/{other.pk}/reviews/{self.review.pk}/comments/',
+            '/api/v1/titles/0/reviews/',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.guest_client.get(f'/api/v1/titles/{other.pk}/reviews/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class AuthorQueriesTests(TestCase):
+    """Автор не подгружается отдельным запросом на каждый объект."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+        users = [
+            User.objects.create(username=f'user{i}', email=f'{i}@yamdb.ru')
+            for i in range(3)
+        ]
+        cls.review = Review.objects.create(title=cls.title, text='Ок',
+                                           author=cls.author, score=7)
+        for user in users:
+            Review.objects.create(title=cls.title, text='Ок',
+                                  author=user, score=5)
+            Comment.objects.create(review_id=cls.review, text='Да',
+                                   author=user)
+        cls.comment = Comment.objects.create(review_id=cls.review,
+                                             text='Да', author=cls.author)
+        cls.reviews_url = f'/api/v1/titles/{cls.title.pk}/reviews/'
+        cls.comments_url = f'{cls.reviews_url}{cls.review.pk}/comments/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def assert_queries(self, count, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, HTTPStatus.BAD_REQUEST)
+        # Savepoints only appear because the test runs in a transaction.
+        queries = [query['sql'] for query in context.captured_queries
+                   if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(queries), count, queries)
+
+    def test_lists(self):
+        for fast in (True, False):
+            with self.subTest(fast=fast), override_settings(
+                FAST_LIST_SERIALIZATION=fast,
+            ):
+                self.assert_queries(2, 'get', self.reviews_url)
+                self.assert_queries(2, 'get', self.comments_url)
+
+    def test_updates(self):
+        # Review edits read the old score and visibility. Text edits
+        # leave counters alone, score edits shift them by the difference.
+        self.assert_queries(3, 'patch', f'{self.reviews_url}{self.review.pk}/',
+                            data={'text': 'Изменено'})
+        self.assert_queries(5, 'patch', f'{self.reviews_url}{self.review.pk}/',
+                            data={'score': 3})
+        self.assert_queries(2, 'patch',
+                            f'{self.comments_url}{self.comment.pk}/',
+                            data={'text': 'Изменено'})
+
+    def test_deletes(self):
+        # Deletes only hide rows, comments of a review stay in place
+        # until archived. Review deletes uncount the title and author,
+        # and recount comments of users who commented on the review.
+        self.assert_queries(3, 'delete',
+                            f'{self.comments_url}{self.comment.pk}/')
+        self.assert_queries(6, 'delete',
+                            f'{self.reviews_url}{self.review.pk}/')
+
+
+class ActivityFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000)
+            for i in range(2)
+        ]
+        start = timezone.now()
+        for i, title in enumerate(titles):
+            review = Review.objects.create(title=title, text=f'Отзыв {i}',
+                                           author=cls.author, score=5 + i)
+            Comment.objects.create(review_id=review, text=f'Ответ {i}',
+                                   author=cls.author)
+        # Equal dates check ordering of rows from different tables.
+        Review.objects.update(pub_date=start)
+        Comment.objects.filter(text='Ответ 0').update(pub_date=start)
+        Comment.objects.filter(text='Ответ 1').update(
+            pub_date=start + dt.timedelta(seconds=1),
+        )
+
+    def setUp(self):
+        self.guest_client = APIClient()
+
+    def read_feed(self, limit):
+        items = []
+        url = f'/api/v1/activity/?limit={limit}'
+        while url:
+            response = self.guest_client.get(url).json()
+            items.extend(response['results'])
+            url = response['next']
+        return items
+
+    def test_feed_merges_reviews_and_comments(self):
+        """Лента объединяет отзывы и комментарии, новые первыми."""
+        items = self.read_feed(limit=1)
+        self.assertEqual(
+            [(item['type'], item['text']) for item in items],
+            [('comment', 'Ответ 1'), ('review', 'Отзыв 1'),
+             ('review', 'Отзыв 0'), ('comment', 'Ответ 0')],
+        )
+        self.assertEqual(items, self.read_feed(limit=3))
+
+    def test_activity_table_gives_same_feed(self):
+        """Предрассчитанная таблица отдаёт ту же ленту."""
+        spammer = User.objects.create(username='spammer',
+                                      email='spammer@yamdb.ru')
+        hidden = Review.objects.create(title=Title.objects.first(),
+                                       text='Скрыт', author=spammer, score=1)
+        Comment.objects.create(review_id=hidden, text='Под скрытым',
+                               author=self.author)
+        hidden.is_hidden = True
+        hidden.save(update_fields=('is_hidden',))
+        # Ties are ordered differently by the table, so dates differ here.
+        for i, review in enumerate(Review.objects.order_by('id')):
+            review.pub_date += dt.timedelta(milliseconds=i + 1)
+            review.save()
+        expected = self.read_feed(limit=2)
+        with override_settings(ACTIVITY_TABLE=True):
+            call_command('rebuild_activity', stdout=io.StringIO())
+            self.assertEqual(len(self.read_feed(2)), len(expected))
+            self.assertEqual(
+                [(item['type'], item['id']) for item in self.read_feed(2)],
+                [(item['type'], item['id']) for item in expected],
+            )
+            review = Review.objects.create(
+                title=Title.objects.first(), text='Новый',
+                author=User.objects.create(username='new',
+                                           email='new@yamdb.ru'),
+                score=1,
+            )
+            comment = Comment.objects.create(review_id=review, text='Да',
+                                             author=review.author)
+            feed = [(item['type'], item['id']) for item in self.read_feed(2)]
+            self.assertIn(('review', review.id), feed)
+            self.assertIn(('comment', comment.id), feed)
+
+
+class UserActivityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000)
+            for i in range(3)
+        ]
+        cls.reviews = [
+            Review.objects.create(title=title, text='Отзыв',
+                                  author=cls.author, score=score)
+            for title, score in zip(cls.titles, (4, 6, 8))
+        ]
+        Comment.objects.create(review_id=cls.reviews[0], text='Ответ',
+                               author=cls.author)
+
+    def setUp(self):
+        self.guest_client = APIClient()
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+
+    def test_counters_follow_reviews_and_comments(self):
+        """Счётчики профиля обновляются при записи, без агрегатов."""
+        self.author.refresh_from_db()
+        self.assertEqual((self.author.review_count,
+                          self.author.comment_count,
+                          self.author.average_score), (3, 1, 6.0))
+        review = Review.objects.get(pk=self.reviews[0].pk)
+        review.score = 10
+        review.save()
+        review.text = 'Изменённый отзыв'
+        review.save()
+        Review.objects.filter(pk=self.reviews[2].pk).delete()
+        hidden = Review.objects.get(pk=self.reviews[1].pk)
+        hidden.is_hidden = True
+        hidden.save(update_fields=('is_hidden',))
+        self.assertEqual(
+            list(Title.objects.filter(
+                pk__in=[title.pk for title in self.titles],
+            ).order_by('pk').values_list('review_count', 'rating')),
+            [(1, 10.0), (0, None), (0, None)],
+        )
+        hidden.is_hidden = False
+        hidden.save(update_fields=('is_hidden',))
+        with CaptureQueriesContext(connection) as context:
+            response = self.author_client.get('/api/v1/users/me/')
+        self.assertEqual(response.json()['review_count'], 2)
+        self.assertEqual(response.json()['average_score'], 8.0)
+        self.assertNotIn('COUNT', ' '.join(
+            query['sql'] for query in context.captured_queries
+        ))
+
+    def test_user_reviews_are_keyset_paginated(self):
+        """Отзывы пользователя листаются курсором, новые первыми."""
+        response = self.guest_client.get(
+            '/api/v1/users/author/reviews/', {'limit': 2},
+        ).json()
+        self.assertEqual(len(response['results']), 2)
+        rest = self.guest_client.get(response['next']).json()
+        self.assertEqual(
+            [item['id'] for item in response['results'] + rest['results']],
+            [review.id for review in reversed(self.reviews)],
+        )
+        self.assertEqual(rest['results'][0]['title'], self.titles[0].id)
+        comments = self.guest_client.get(
+            '/api/v1/users/author/comments/',
+        ).json()['results']
+        self.assertEqual(comments[0]['review'], self.reviews[0].id)
+        self.assertEqual(
+            self.guest_client.get('/api/v1/users/nobody/reviews/')
+            .status_code,
+            HTTPStatus.NOT_FOUND,
+        )
+
+
+class ReviewAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yamdb.ru', password='admin',
+        )
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(context.captured_queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        """Список отзывов в админке не делает запросов на каждую строку."""
+        urls = ('/admin/reviews/review/', '/admin/reviews/comment/')
+        review = Review.objects.create(title=self.title, text='Отзыв',
+                                       author=self.admin, score=5)
+        Comment.objects.create(review_id=review, text='Ответ',
+                               author=self.admin)
+        expected = [self.changelist_queries(url) for url in urls]
+        for i in range(3):
+            author = User.objects.create(username=f'user{i}',
+                                         email=f'user{i}@yamdb.ru')
+            review = Review.objects.create(title=self.title, text='Отзыв',
+                                           author=author, score=5)
+            Comment.objects.create(review_id=review, text='Ответ',
+                                   author=author)
+        self.assertEqual(
+            [self.changelist_queries(url) for url in urls], expected,
+        )
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            Genres.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+
+    def setUp(self):
+        self.guest_client = APIClient()
+
+    def test_small_tables_get_exact_count(self):
+        """Ниже порога отдаётся точное количество."""
+        response = self.guest_client.get('/api/v1/genres/', {'limit': 2})
+        self.assertEqual(response.json()['count'], 3)
+        self.assertFalse(response.json()['count_is_estimate'])
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=2)
+    def test_pages_past_low_estimate_are_reachable(self):
+        """Заниженная оценка не прячет страницы с отзывами."""
+        title = Title.objects.create(name='Титаник', year=1997)
+        authors = [
+            User.objects.create(username=f'user{i}', email=f'user{i}@yamdb.ru')
+            for i in range(25)
+        ]
+        Review.objects.bulk_create(
+            Review(title=title, text='Отзыв', author=author, score=5)
+            for author in authors
+        )
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        pages = []
+        with mock.patch('reviews.paginators.estimate_count',
+                        return_value=10):
+            while url:
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                pages.append(response.json())
+                url = pages[-1]['next']
+            response = self.guest_client.get(
+                f'/api/v1/titles/{title.pk}/reviews/', {'page': 4},
+            )
+        self.assertEqual([len(page['results']) for page in pages],
+                         [10, 10, 5])
+        self.assertTrue(all(page['count_is_estimate'] for page in pages))
+        self.assertEqual(pages[-1]['count'], 25)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_plan_rows_are_read_from_explain_output(self):
+        """Оценка берётся из вывода EXPLAIN (FORMAT JSON) PostgreSQL."""
+        # Output of PostgreSQL 13 for the review admin changelist.
+        output = """[
+          {
+            "Plan": {
+              "Node Type": "Seq Scan",
+              "Parallel Aware": false,
+              "Relation Name": "review for title",
+              "Alias": "review for title",
+              "Startup Cost": 0.00,
+              "Total Cost": 1887.00,
+              "Plan Rows": 99950,
+              "Plan Width": 53,
+              "Filter": "(NOT is_hidden)"
+            }
+          }
+        ]"""
+        # psycopg2 returns the column decoded, other drivers as text.
+        self.assertEqual(get_plan_rows(json.loads(output)), 99950)
+        self.assertEqual(get_plan_rows(output), 99950)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=2)
+    def test_large_tables_get_estimate(self):
+        """Выше порога отдаётся оценка планировщика без COUNT(*)."""
+        estimate = mock.patch('reviews.paginators.estimate_count',
+                              return_value=2)
+        with estimate, CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get('/api/v1/genres/',
+                                             {'limit': 2})
+        data = response.json()
+        self.assertTrue(data['count_is_estimate'])
+        self.assertEqual(data['count'], 2)
+        self.assertIsNotNone(data['next'])
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+        with estimate:
+            data = self.guest_client.get(data['next']).json()
+        self.assertEqual(data['count'], 3)
+        self.assertIsNone(data['next'])
+
+
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.moderator = User.objects.create(username='moderator',
+                                            email='moderator@yamdb.ru',
+                                            role=User.MODERATOR)
+        cls.spammer = User.objects.create(username='spammer',
+                                          email='spammer@yamdb.ru')
+        cls.reader = User.objects.create(username='reader',
+                                         email='reader@yamdb.ru')
+        cls.titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000)
+            for i in range(5)
+        ]
+        for title in cls.titles:
+            spam = Review.objects.create(title=title, text='Спам',
+                                         author=cls.spammer, score=1)
+            Comment.objects.create(review_id=spam, text='Ответ',
+                                   author=cls.reader)
+            Review.objects.create(title=title, text='Отзыв',
+                                  author=cls.reader, score=9)
+
+    def setUp(self):
+        self.moderator_client = APIClient()
+        self.moderator_client.force_authenticate(self.moderator)
+
+    def test_bulk_delete_recounts_ratings_and_counters(self):
+        """Массовое удаление обновляет рейтинги и счётчики разом."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.moderator_client.post(
+                '/api/v1/moderation/',
+                {'action': 'delete', 'target': 'reviews',
+                 'username': 'spammer'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        summary = response.json()
+        self.assertEqual(
+            (summary['reviews'], summary['comments'], summary['titles'],
+             summary['authors']),
+            (5, 5, 5, 2),
+        )
+        # Number of statements does not depend on the number of rows.
+        self.assertLess(len(context.captured_queries), 15)
+        self.assertEqual(
+            set(Title.objects.values_list('rating', 'review_count')),
+            {(9.0, 1)},
+        )
+        self.reader.refresh_from_db()
+        self.assertEqual(
+            (self.reader.review_count, self.reader.comment_count), (5, 0),
+        )
+        self.assertEqual(
+            Tombstone.objects.filter(entity='review').count(), 5,
+        )
+
+    def test_bulk_hide_removes_reviews_from_lists(self):
+        """Скрытые отзывы пропадают из списков и рейтинга."""
+        title = self.titles[0]
+        review = Review.objects.get(title=title, author=self.spammer)
+        response = self.moderator_client.post(
+            '/api/v1/moderation/',
+            {'action': 'hide', 'target': 'reviews', 'ids': [review.id]},
+            format='json',
+        )
+        self.assertEqual(response.json()['reviews'], 1)
+        reviews = self.moderator_client.get(
+            f'/api/v1/titles/{title.id}/reviews/',
+        ).json()['results']
+        self.assertEqual([item['author'] for item in reviews], ['reader'])
+        title.refresh_from_db()
+        self.assertEqual(title.rating, 9.0)
+
+    def test_only_moderators_and_filters(self):
+        """Только модераторы и только с фильтром."""
+        reader_client = APIClient()
+        reader_client.force_authenticate(self.reader)
+        data = {'action': 'delete', 'target': 'comments'}
+        self.assertEqual(
+            reader_client.post('/api/v1/moderation/', {
+                **data, 'username': 'spammer',
+            }, format='json').status_code,
+            HTTPStatus.FORBIDDEN,
+        )
+        self.assertEqual(
+            self.moderator_client.post(
+                '/api/v1/moderation/', data, format='json',
+            ).status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+
+
+class SoftDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.reader = User.objects.create(username='reader',
+                                         email='reader@yamdb.ru')
+        cls.title = Title.objects.create(name='Произведение', year=2000)
+        cls.review = Review.objects.create(title=cls.title, text='Отзыв',
+                                           author=cls.author, score=4)
+        Review.objects.create(title=cls.title, text='Другой отзыв',
+                              author=cls.reader, score=8)
+        Comment.objects.create(review_id=cls.review, text='Ответ',
+                               author=cls.reader)
+        cls.reviews_url = f'/api/v1/titles/{cls.title.pk}/reviews/'
+
+    def test_delete_hides_until_archived(self):
+        """Удалённый отзыв скрыт до архивации, затем уходит в архив."""
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.delete(f'{self.reviews_url}{self.review.pk}/')
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        review = Review.objects.get(pk=self.review.pk)
+        self.assertTrue(review.is_hidden)
+        self.assertIsNotNone(review.deleted_at)
+        self.assertEqual(
+            Title.objects.values_list('rating', 'review_count').get(),
+            (8.0, 1),
+        )
+        results = client.get(self.reviews_url).json()['results']
+        self.assertEqual([item['author'] for item in results], ['reader'])
+
+        with tempfile.TemporaryDirectory() as output:
+            call_command('archive_reviews', days=0, output=output, pause=0,
+                         stdout=io.StringIO())
+            archived = {}
+            for name in os.listdir(output):
+                with gzip.open(os.path.join(output, name), 'rt') as archive:
+                    archived[name.split('-')[0]] = [
+                        json.loads(line)['text'] for line in archive
+                    ]
+        self.assertEqual(archived, {'review': ['Отзыв'],
+                                    'comment': ['Ответ']})
+        self.assertFalse(Review.objects.filter(pk=self.review.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            User.objects.values_list('comment_count', flat=True).get(
+                pk=self.reader.pk,
+            ),
+            0,
+        )
+        self.assertTrue(Tombstone.objects.filter(
+            entity='review', object_id=self.review.pk,
+        ).exists())
+
+    def test_author_can_review_again_after_delete(self):
+        """После удаления отзыва автор может написать новый."""
+        client = APIClient()
+        client.force_authenticate(self.author)
+        data = {'text': 'Новый отзыв', 'score': 9}
+        response = client.post(self.reviews_url, data)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        client.delete(f'{self.reviews_url}{self.review.pk}/')
+        response = client.post(self.reviews_url, data)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        response = client.post(self.reviews_url, data)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_title_delete_after_review_delete(self):
+        """Удаление произведения не вычитает комментарии дважды."""
+        client = APIClient()
+        client.force_authenticate(self.author)
+        client.delete(f'{self.reviews_url}{self.review.pk}/')
+        Comment.objects.create(review_id=Review.objects.get(
+            author=self.reader,
+        ), text='Ответ себе', author=self.reader)
+        self.title.delete()
+        self.assertEqual(
+            User.objects.values_list('comment_count', flat=True).get(
+                pk=self.reader.pk,
+            ),
+            0,
+        )
+
+    @override_settings(ACTIVITY_TABLE=True)
+    def test_comments_of_deleted_review_are_hidden(self):
+        """Комментарии удалённого отзыва пропадают из лент и счётчиков."""
+        title = Title.objects.create(name='Другое произведение', year=2001)
+        review = Review.objects.create(title=title, text='Ещё отзыв',
+                                       author=self.author, score=6)
+        Comment.objects.filter(review_id=self.review).delete()
+        Comment.objects.create(review_id=review, text='Ответ',
+                               author=self.reader)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        client.delete(f'/api/v1/titles/{title.pk}/reviews/{review.pk}/')
+        self.assertEqual(
+            User.objects.values_list('comment_count', flat=True).get(
+                pk=self.reader.pk,
+            ),
+            0,
+        )
+        response = client.get('/api/v1/users/reader/comments/')
+        self.assertEqual(response.json()['results'], [])
+        for table in (True, False):
+            with self.subTest(table=table), override_settings(
+                ACTIVITY_TABLE=table,
+            ):
+                results = client.get('/api/v1/activity/').json()['results']
+                self.assertNotIn('comment',
+                                 [item['type'] for item in results])
+
+
+@override_settings(AUTOCOMPLETE_REFRESH=0)
+class TitleAutocompleteTests(TestCase):
+    url = '/api/v1/titles/autocomplete/'
+
+    @classmethod
+    def setUpTestData(cls):
+        for name, review_count in (('Мастер и Маргарита', 5),
+                                   ('Матрица', 2), ('Маугли', 7),
+                                   ('Брат', 9)):
+            Title.objects.create(name=name, year=2000,
+                                 review_count=review_count)
+
+    def setUp(self):
+        autocomplete.index.reset()
+
+    def get_names(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [item['name'] for item in response.json()]
+
+    def test_prefix_ranked_by_reviews(self):
+        """Подсказки по префиксу, популярные первыми."""
+        self.assertEqual(self.get_names('ма'),
+                         ['Маугли', 'Мастер и Маргарита', 'Матрица'])
+        self.assertEqual(self.get_names('МАТ'), ['Матрица'])
+        self.assertEqual(self.get_names('ма', limit=1), ['Маугли'])
+        self.assertEqual(self.get_names(' '), [])
+
+    def test_follows_title_changes(self):
+        """Индекс догоняет изменения и удаления произведений."""
+        self.get_names('ма')
+        Title.objects.filter(name='Матрица').update(
+            name='Бумер', updated_at=timezone.now(),
+        )
+        Title.objects.get(name='Маугли').delete()
+        self.assertEqual(self.get_names('ма'), ['Мастер и Маргарита'])
+        self.assertEqual(self.get_names('б'), ['Брат', 'Бумер'])
+
+
+class TitleFilterTests(TestCase):
+    url = '/api/v1/titles/'
+
+    @classmethod
+    def setUpTestData(cls):
+        drama = Genres.objects.create(name='Драма', slug='drama')
+        comedy = Genres.objects.create(name='Комедия', slug='comedy')
+        horror = Genres.objects.create(name='Ужасы', slug='horror')
+        films = Categories.objects.create(name='Фильмы', slug='films')
+        books = Categories.objects.create(name='Книги', slug='books')
+        for name, year, rating, category, genres in (
+            ('Брат', 1997, 9.0, films, (drama, comedy)),
+            ('Жмурки', 2005, 7.0, films, (comedy,)),
+            ('Вий', 1835, 8.0, books, (horror,)),
+            ('Груз 200', 2007, None, films, (drama, horror)),
+        ):
+            title = Title.objects.create(name=name, year=year, rating=rating,
+                                         category=category)
+            title.genre.set(genres)
+
+    def get_names(self, query):
+        response = self.client.get(f'{self.url}?{query}')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_combined_filters(self):
+        """Несколько жанров и категорий, диапазоны года и рейтинга."""
+        cases = (
+            ('genre=drama,comedy', ['Брат', 'Груз 200', 'Жмурки']),
+            ('genre=horror&category=books', ['Вий']),
+            ('category=films,books&year_min=2000&year_max=2006',
+             ['Жмурки']),
+            ('rating_min=7.5&rating_max=9', ['Брат', 'Вий']),
+            ('genre=comedy&ordering=-rating', ['Брат', 'Жмурки']),
+            ('ordering=year', ['Вий', 'Брат', 'Жмурки', 'Груз 200']),
+            ('ordering=-rating', ['Брат', 'Вий', 'Жмурки', 'Груз 200']),
+            ('ordering=rating', ['Жмурки', 'Вий', 'Брат', 'Груз 200']),
+        )
+        for query, names in cases:
+            with self.subTest(query=query):
+                self.assertEqual(self.get_names(query), names)
+
+    def test_ordering_ends_with_pk(self):
+        """Одинаковые значения упорядочены по id, страницы стабильны."""
+        titles = [
+            Title.objects.create(name='Ремейк', year=2000, rating=5.0)
+            for _ in range(3)
+        ]
+        for ordering in ('year', '-rating', 'name'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(self.url, {
+                    'ordering': ordering, 'year': 2000,
+                })
+                self.assertEqual(
+                    [item['id'] for item in response.json()['results']],
+                    [title.id for title in titles],
+                )
+
+    def test_genre_filter_uses_exists(self):
+        """Фильтр по жанрам не размножает строки и не требует DISTINCT."""
+        with CaptureQueriesContext(connection) as context:
+            self.get_names('genre=drama,horror&fields=id,name')
+        sql = context.captured_queries[-1]['sql']
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_facets(self):
+        """Счётчики фасетов без собственного фильтра, с кешем."""
+        cache.clear()
+        # Loads slug tables of genres and categories.
+        self.client.get(f'{self.url}facets/')
+        url = f'{self.url}facets/?genre=drama&year_min=2000'
+        with CaptureQueriesContext(connection) as context:
+            facets = self.client.get(url).json()
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertEqual(
+            [(row['slug'], row['count']) for row in facets['genre']],
+            [('comedy', 1), ('drama', 1), ('horror', 1)],
+        )
+        self.assertEqual(facets['category'],
+                         [{'slug': 'films', 'name': 'Фильмы', 'count': 1}])
+        self.assertEqual(facets['year'], [{'year': 2007, 'count': 1},
+                                          {'year': 1997, 'count': 1}])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).json(), facets)
+        self.assertEqual(len(context.captured_queries), 0)
+        Title.objects.create(name='Сёстры', year=2001).genre.set(
+            Genres.objects.filter(slug='drama'),
+        )
+        facets = self.client.get(url).json()
+        self.assertEqual(facets['category'][0]['count'], 1)
+        self.assertEqual(facets['genre'][0], {
+            'slug': 'drama', 'name': 'Драма', 'count': 2,
+        })
+        self.assertEqual(facets['year'][0], {'year': 2007, 'count': 1})
+        self.assertIn({'year': 2001, 'count': 1}, facets['year'])
+
+
+class SlugLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin',
+                                        email='admin@yamdb.ru',
+                                        role=User.ADMIN)
+        Categories.objects.create(name='Фильмы', slug='films')
+        Genres.objects.create(name='Драма', slug='drama')
+        Genres.objects.create(name='Комедия', slug='comedy')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_title_write_resolves_slugs_without_queries(self):
+        """Слаги жанров и категорий берутся из таблиц в памяти."""
+        lookups.genres.load()
+        lookups.categories.load()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/v1/titles/', {
+                'name': 'Брат', 'year': 1997, 'category': 'films',
+                'genre': ['drama', 'comedy'],
+            }, format='json')
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['genre'], ['drama', 'comedy'])
+        self.assertFalse([query['sql'] for query in context.captured_queries
+                          if '"slug" =' in query['sql']])
+        response = self.client.post('/api/v1/titles/', {
+            'name': 'Брат 2', 'year': 2000, 'category': 'books',
+            'genre': ['drama'],
+        }, format='json')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_tables_load_without_readable_version(self):
+        """Без версии в кеше таблицы читаются из БД, новые id догружаются."""
+        title = Title.objects.create(name='Брат', year=1997)
+        title.genre.set(Genres.objects.filter(slug='drama'))
+        dummy = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }}
+        with self.settings(CACHES=dummy):
+            lookups.genres.load(force=True)
+            # Written without signals, the table does not know it.
+            Genres.objects.bulk_create([Genres(name='Ужасы', slug='horror')])
+            title.genre.add(Genres.objects.get(slug='horror'))
+            response = self.client.get('/api/v1/titles/')
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(
+                [genre['slug']
+                 for genre in response.json()['results'][0]['genre']],
+                ['drama', 'horror'],
+            )
+            response = self.client.get('/api/v1/titles/', {'genre': 'drama'})
+            self.assertEqual(len(response.json()['results']), 1)
+
+    def test_tables_follow_changes_of_other_processes(self):
+        """Смена версии в общем кеше перечитывает таблицу."""
+        self.assertIsNone(lookups.genres.get('horror'))
+        # Another process adds a genre and replaces the version.
+        Genres.objects.bulk_create([Genres(name='Ужасы', slug='horror')])
+        cache.set(lookups.genres.key, 'other')
+        self.assertEqual(lookups.genres.get('horror')[1], 'Ужасы')
+
+    def test_genre_delete_by_slug(self):
+        lookups.genres.load()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete('/api/v1/genres/unknown/')
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse([query for query in context.captured_queries
+                          if 'genre' in query['sql']])
+        self.client.delete('/api/v1/genres/drama/')
+        self.assertIsNone(lookups.genres.get('drama'))
+        self.assertFalse(Genres.objects.filter(slug='drama').exists())
+
+    def test_duplicate_slugs_are_not_resolved_to_one_row(self):
+        """Повторяющийся слаг не сводится молча к одной из строк."""
+        Genres.objects.create(name='Драма 2', slug='drama')
+        with self.assertRaises(Genres.MultipleObjectsReturned):
+            lookups.genres.get('drama')
+        self.assertEqual(len(lookups.genres.get_ids(['drama', 'comedy'])), 3)
+        self.client.delete('/api/v1/genres/drama/')
+        self.assertFalse(Genres.objects.filter(slug='drama').exists())
+
+
+class StartupTests(SimpleTestCase):
+    # Timings depend on the machine, bench_startup reports them.
+
+    def test_api_profile_starts_lean(self):
+        """API-профиль не грузит админку, сессии и djoser."""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {'DB_ENGINE': 'django.db.backends.sqlite3',
+                   'DB_NAME': os.path.join(directory, 'db.sqlite3'),
+                   'DJANGO_SETTINGS_MODULE': 'api_yamdb.settings_api'}
+            subprocess.run(
+                (sys.executable, 'manage.py', 'migrate', '-v', '0'),
+                cwd=settings.BASE_DIR, env={**os.environ, **env},
+                check=True,
+            )
+            startup = measure_startup('api_yamdb.settings_api', env=env)
+        self.assertEqual(startup['status'], '200 OK')
+        self.assertEqual(startup['heavy'], [])
+
+
+class PublicCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='reader',
+                                       email='reader@yamdb.ru')
+
+    def test_refresh_covers_every_encoding(self):
+        """Обновление кэша запрашивает каждый вариант сжатия."""
+        with override_settings(CACHE_PURGE_URL='http://nginx'):
+            with mock.patch('api.purge.urlopen') as urlopen:
+                purge.refresh(('/api/v1/genres/',))
+        self.assertEqual(
+            [(request.full_url, request.get_header('Accept-encoding'))
+             for (request,), _ in urlopen.call_args_list],
+            [('http://nginx/api/v1/genres/', encoding)
+             for encoding in ('identity', 'gzip', 'br')],
+        )
+
+    def test_anonymous_reads_are_public(self):
+        """Анонимные ответы каталога кэшируются, авторизованные - нет."""
+        client = APIClient()
+        with override_settings(API_CACHE_MAX_AGE=5):
+            response = client.get('/api/v1/genres/')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=5')
+            self.assertIn('Authorization', response['Vary'])
+            client.force_authenticate(self.user)
+            response = client.get('/api/v1/genres/')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+
+@override_settings(CHANGE_FEED_LAG=0)
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.titles = [
+            Title.objects.create(name=f'Произведение {i}', year=2000 + i)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.guest_client = APIClient()
+
+    def test_titles_feed_is_keyset_paginated(self):
+        """Лента изменений листается курсором без пропусков."""
+        response = self.guest_client.get(
+            '/api/v1/changes/titles/', {'limit': 2},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        first = response.json()
+        self.assertEqual(len(first['results']), 2)
+        self.assertIn('updated_at', first['results'][0])
+        second = self.guest_client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']],
+            [title.id for title in self.titles],
+        )
+
+    def test_feed_returns_only_changes_since_cursor(self):
+        """После курсора отдаются только изменённые и удалённые объекты."""
+        cursor = self.guest_client.get(
+            '/api/v1/changes/titles/',
+        ).json()['cursor']
+        review = Review.objects.create(title=self.titles[1], text='Хорошо',
+                                       author=self.author, score=8)
+        response = self.guest_client.get(
+            '/api/v1/changes/titles/', {'cursor': cursor},
+        ).json()
+        self.assertEqual([item['id'] for item in response['results']],
+                         [self.titles[1].id])
+        self.assertEqual(response['results'][0]['rating'], 8.0)
+        review_id = review.id
+        review.delete()
+        response = self.guest_client.get('/api/v1/changes/deleted/').json()
+        self.assertEqual(
+            [(item['entity'], item['object_id'])
+             for item in response['results']],
+            [('review', review_id)],
+        )
+
+    def test_hidden_rows_do_not_expose_content(self):
+        """Скрытые и удалённые записи отдаются в ленте без текста."""
+        review = Review.objects.create(title=self.titles[0], text='Спам',
+                                       author=self.author, score=1)
+        comment = Comment.objects.create(review_id=review, text='Ответ',
+                                         author=self.author)
+        review.is_hidden = True
+        review.save(update_fields=('is_hidden',))
+        comment.is_hidden = True
+        comment.deleted_at = timezone.now()
+        comment.save(update_fields=('is_hidden', 'deleted_at'))
+        for entity in ('reviews', 'comments'):
+            response = self.guest_client.get(f'/api/v1/changes/{entity}/')
+            item, = response.json()['results']
+            self.assertEqual(
+                sorted(item), ['deleted_at', 'hidden', 'id', 'updated_at'],
+            )
+            self.assertTrue(item['hidden'])
+
+    def test_updated_since_filters_old_rows(self):
+        """Параметр updated_since отсекает старые изменения."""
+        since = timezone.now() + dt.timedelta(minutes=1)
+        response = self.guest_client.get(
+            '/api/v1/changes/titles/', {'updated_since': since.isoformat()},
+        )
+        self.assertEqual(response.json()['results'], [])
+        for params in ({'cursor': 'bad'},
+                       {'updated_since': '2020-13-01T00:00:00'},
+                       {'updated_since': '2020-02-30T25:00:00'}):
+            response = self.guest_client.get('/api/v1/changes/titles/',
+                                             params)
+            self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class TitleEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author',
+                                         email='author@yamdb.ru')
+        cls.title = Title.objects.create(name='Титаник', year=1997)
+        cls.review = Review.objects.create(title=cls.title, text='Отлично',
+                                           author=cls.author, score=9)
+
+    def stream(self, path, events=()):
+        """Runs event stream, publishes events and disconnects."""
+        messages = []
+
+        async def run():
+            stop = asyncio.Event()
+
+            async def receive():
+                await stop.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message.get('body') == b': stream\n\n':
+                    for event in events:
+                        broker.publish(event)
+                elif len(messages) == 2 + len(events):
+                    stop.set()
+
+            scope = {'type': 'http', 'method': 'GET', 'path': path}
+            await application(scope, receive, send)
+
+        async_to_sync(run)()
+        return messages  # noqa: R504
+
+    def test_stream_sends_new_reviews(self):
+        """Поток событий произведения получает новые отзывы."""
+        event = make_event(self.review)
+        messages = self.stream(f'/api/v1/titles/{self.title.pk}/events/',
+                               (event,))
+        self.assertEqual(messages[0]['status'], HTTPStatus.OK)
+        self.assertIn((b'content-type', b'text/event-stream'),
+                      messages[0]['headers'])
+        body = messages[2]['body'].decode()
+        self.assertTrue(body.startswith('event: review\n'))
+        self.assertIn('"text": "Отлично"', body)
+        self.assertEqual(broker.subscribers, {})
+
+    def test_comment_event_has_title(self):
+        """Событие комментария относится к произведению отзыва."""
+        comment = Comment.objects.create(review_id=self.review, text='Да',
+                                         author=self.author)
+        event = make_event(comment)
+        self.assertEqual(event['title'], self.title.pk)
+        self.assertEqual(event['review'], self.review.pk)
+
+    def test_stream_of_missing_title(self):
+        """Поток несуществующего произведения - 404."""
+        messages = self.stream('/api/v1/titles/0/events/')
+        self.assertEqual(messages[0]['status'], HTTPStatus.NOT_FOUND)
+
+    def test_lost_listen_connection_is_reopened(self):
+        """Оборванное LISTEN-соединение открывается снова."""
+        postgres = PostgresBroker()
+        loop = mock.Mock()
+        postgres.subscribers = {self.title.pk: {(loop, None)}}
+        lost = postgres.listener = mock.Mock()
+        lost.poll.side_effect = OSError('server closed the connection')
+        with mock.patch.object(postgres, 'listen',
+                               side_effect=OSError('no route')) as listen:
+            with self.assertLogs('api.events', 'ERROR'):
+                postgres.poll(loop)
+            self.assertIsNone(postgres.listener)
+            lost.close.assert_called_once_with()
+            listen.side_effect = None
+            with self.assertLogs('api.events', 'WARNING'):
+                postgres.ensure_listener(loop)
+        self.assertEqual(listen.call_count, 2)
+
+
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = APIClient()
+
+    def test_signup_is_throttled_by_email_before_db_queries(self):
+        """Лишние запросы регистрации отклоняются без обращения к БД."""
+        rates = {'auth_ip': '100/min', 'auth_username': '100/min',
+                 'auth_email': '2/hour'}
+        with self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates,
+        }):
+            for username in ('first', 'second'):
+                response = self.guest_client.post('/api/v1/auth/signup/', {
+                    'username': username, 'email': 'spam@yamdb.ru',
+                })
+                self.assertNotEqual(response.status_code,
+                                    HTTPStatus.TOO_MANY_REQUESTS)
+            with self.assertNumQueries(0):
+                response = self.guest_client.post('/api/v1/auth/signup/', {
+                    'username': 'third', 'email': 'SPAM@yamdb.ru',
+                })
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(get_metrics('auth_email'),
+                         {'allowed': 2, 'rejected': 1})
+
+    def test_signup_is_throttled_per_forwarded_address(self):
+        """У каждого адреса из X-Forwarded-For своё ведро."""
+        rates = {'auth_ip': '1/min', 'auth_username': '100/min',
+                 'auth_email': '100/min'}
+        with self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates,
+        }):
+            statuses = [
+                self.guest_client.post('/api/v1/auth/signup/', {},
+                                       HTTP_X_FORWARDED_FOR=address,
+                                       ).status_code
+                for address in ('203.0.113.1', '203.0.113.1',
+                                '203.0.113.2')
+            ]
+        self.assertEqual(statuses, [HTTPStatus.BAD_REQUEST,
+                                    HTTPStatus.TOO_MANY_REQUESTS,
+                                    HTTPStatus.BAD_REQUEST])
+
+    @override_settings(CACHES=UNREACHABLE_CACHE)
+    def test_signup_is_throttled_locally_without_cache(self):
+        """Без кеша ведра живут в процессе, а не отклоняют всех."""
+        local_store.buckets.clear()
+        rates = {'auth_ip': '1/min', 'auth_username': '100/min',
+                 'auth_email': '100/min'}
+        with self.settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates,
+        }):
+            statuses = [
+                self.guest_client.post('/api/v1/auth/signup/', {}).status_code
+                for _ in range(2)
+            ]
+        self.assertEqual(statuses, [HTTPStatus.BAD_REQUEST,
+                                    HTTPStatus.TOO_MANY_REQUESTS])
+
+    def test_repeated_signup_does_not_resend_email(self):
+        """Повторная регистрация в окне не отправляет новое письмо."""
+        data = {'username': 'newbie', 'email': 'newbie@yamdb.ru'}
+        first = self.guest_client.post('/api/v1/auth/signup/', data)
+        with self.assertNumQueries(0):
+            second = self.guest_client.post('/api/v1/auth/signup/', data)
+        self.assertEqual(second.status_code, HTTPStatus.OK)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class FastJSONTests(SimpleTestCase):
+    data = {
+        'count': 2,
+        'results': [
+            {
+                'id': 1,
+                'text': 'Отзыв \u2028 с разделителем',
+                'rating': Decimal('7.5'),
+                'pub_date': timezone.now(),
+                'score': 10,
+            },
+            {
+                'id': 2,
+                'rating': None,
+                'pub_date': dt.datetime(2022, 3, 6, 16, 45, 1, 123),
+                1: 'нестроковый ключ',
+            },
+        ],
+    }
+
+    @override_settings(JSON_COMPATIBILITY_MODE=True)
+    def test_compatibility_mode_is_byte_identical(self):
+        """В режиме совместимости вывод совпадает с JSONRenderer."""
+        self.assertEqual(FastJSONRenderer().render(self.data),
+                         JSONRenderer().render(self.data))
+        for value in (1e16, 1.5e-7, 1e-5, 9.99e-5, Decimal('0.00002'),
+                      1e-4, 0.0, -2.5):
+            data = {'results': [{'score': value}]}
+            self.assertEqual(FastJSONRenderer().render(data),
+                             JSONRenderer().render(data))
+
+    @override_settings(JSON_COMPATIBILITY_MODE=True)
+    def test_compatibility_mode_rejects_non_finite_floats(self):
+        """NaN и Infinity не превращаются в null, как и в JSONRenderer."""
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'results': [{'rating': value}]})
+
+    def test_parser_round_trip(self):
+        """Парсер читает то, что записал рендерер."""
+        content = FastJSONRenderer().render({'text': 'Отзыв', 'score': 5})
+        parsed = FastJSONParser().parse(io.BytesIO(content))
+        self.assertEqual(parsed, {'text': 'Отзыв', 'score': 5})
@@ -0,0 +1,200 @@
+"""
+Token-bucket throttling for signup and token endpoints.
+
+Buckets live in the default cache, so they are shared between workers
+when the cache is. If the cache is unavailable, an in-process store
+is used instead. Memcached clients do not raise when the server is
+down, so a lock that can neither be taken nor read counts as an
+unavailable cache.
+"""
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+LOCK_ATTEMPTS = 3
+LOCK_DELAY = 0.005
+METRICS_KEY = 'throttle:metrics:{scope}:{result}'
+METRICS_TIMEOUT = 24 * 60 * 60
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+class CacheUnavailableError(Exception):
+    """The cache neither stores nor returns values."""
+
+
+def parse_rate(rate):
+    """Returns bucket capacity and refill rate in tokens per second."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class BucketStore:
+    """Atomic token-bucket consumption on top of get/set storage."""
+
+    def consume(self, key, capacity, rate):
+        """
+        Takes one token from the bucket. Returns seconds to wait
+        for the next token, 0 if the token was taken.
+        """
+        with self.lock(key) as locked:
+            if not locked:
+                return 1 / rate
+            now = time.time()
+            tokens, stamp = self.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            self.set(key, (tokens - 1, now), timeout=capacity / rate)
+            return 0
+
+
+class CacheBucketStore(BucketStore):
+    """Buckets in the default cache, locked with atomic cache.add."""
+
+    @contextmanager
+    def lock(self, key):
+        lock_key = f'{key}:lock'
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock_key, 1, timeout=1):
+                break
+            time.sleep(LOCK_DELAY)
+        else:
+            if cache.get(lock_key) is None:
+                raise CacheUnavailableError(lock_key)
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            cache.delete(lock_key)
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, value, timeout):
+        cache.set(key, value, timeout=timeout)
+
+
+class LocalBucketStore(BucketStore):
+    """In-process buckets, expired entries are dropped on access."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.mutex = threading.Lock()
+
+    @contextmanager
+    def lock(self, key):
+        with self.mutex:
+            yield True
+
+    def get(self, key):
+        value, expires = self.buckets.get(key, (None, 0))
+        if expires < time.time():
+            self.buckets.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, timeout):
+        self.buckets[key] = (value, time.time() + timeout)
+
+
+shared_store = CacheBucketStore()
+local_store = LocalBucketStore()
+
+
+def record(scope, result):
+    """Counts allowed and rejected requests per scope."""
+    key = METRICS_KEY.format(scope=scope, result=result)
+    try:
+        cache.add(key, 0, timeout=METRICS_TIMEOUT)
+        cache.incr(key)
+    except Exception:
+        # Metrics must never break requests.
+        pass
+
+
+def get_metrics(scope):
+    """Returns allowed and rejected request counts for scope."""
+    return {
+        result: cache.get(METRICS_KEY.format(scope=scope, result=result), 0)
+        for result in ('allowed', 'rejected')
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base throttle with one bucket per identifier returned by
+    ``get_bucket_ident``. Rate is taken from DEFAULT_THROTTLE_RATES
+    by ``scope``.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_bucket_ident(self, request):
+        raise NotImplementedError('.get_bucket_ident() must be overridden')
+
+    def allow_request(self, request, view):
+        ident = self.get_bucket_ident(request)
+        if not ident:
+            return True
+        capacity, rate = parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES[self.scope],
+        )
+        digest = hashlib.sha1(ident.encode()).hexdigest()
+        key = f'throttle:{self.scope}:{digest}'
+        try:
+            self.wait_time = shared_store.consume(key, capacity, rate)
+        except Exception:
+            # Cache backends raise their own errors when unreachable.
+            logger.warning('Throttle cache unavailable, using local store')
+            self.wait_time = local_store.consume(key, capacity, rate)
+        if self.wait_time:
+            record(self.scope, 'rejected')
+            logger.info('Throttled %s for %s', self.scope, ident)
+            return False
+        record(self.scope, 'allowed')
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    scope = 'auth_ip'
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+class RequestDataThrottle(TokenBucketThrottle):
+    """Bucket per value of ``field`` in request body."""
+
+    field = None
+
+    def get_bucket_ident(self, request):
+        data = request.data
+        if not hasattr(data, 'get'):
+            return None
+        return str(data.get(self.field, '')).strip().lower()
+
+
+class AuthUsernameThrottle(RequestDataThrottle):
+    scope = 'auth_username'
+    field = 'username'
+
+
+class AuthEmailThrottle(RequestDataThrottle):
+    scope = 'auth_email'
+    field = 'email'
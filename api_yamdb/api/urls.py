@@ -1,8 +1,12 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView, TokenVerifyView)
 
-from .views import (AuthenticationViewSet, CategoryViewSet, CommentViewSet,
-                    GenresViewSet, ReviewViewSet, TitlesViewSet, UserViewSet)
+from .views import (ActivityViewSet, AuthenticationViewSet, CategoryViewSet,
+                    ChangesViewSet, CommentViewSet, GenresViewSet,
+                    ModerationViewSet, ReviewViewSet, TitlesViewSet,
+                    UserViewSet)
 
 app_name = 'api'
 
@@ -16,10 +20,23 @@ router_v1.register('users', UserViewSet)
 router_v1.register('categories', CategoryViewSet)
 router_v1.register('genres', GenresViewSet)
 router_v1.register('titles', TitlesViewSet, basename='titles')
+router_v1.register(r'changes/(?P<entity>titles|reviews|comments|deleted)',
+                   ChangesViewSet, basename='changes')
+router_v1.register('activity', ActivityViewSet, basename='activity')
+router_v1.register('moderation', ModerationViewSet, basename='moderation')
 router_v1.register('auth', AuthenticationViewSet,
                    basename='get_confirmation_code')
 
+# Same routes as djoser.urls.jwt, without importing the rest of djoser.
+jwt_patterns = [
+    re_path(r'^jwt/create/?', TokenObtainPairView.as_view(),
+            name='jwt-create'),
+    re_path(r'^jwt/refresh/?', TokenRefreshView.as_view(),
+            name='jwt-refresh'),
+    re_path(r'^jwt/verify/?', TokenVerifyView.as_view(), name='jwt-verify'),
+]
+
 urlpatterns = [
-    path('v1/', include('djoser.urls.jwt')),
+    path('v1/', include(jwt_patterns)),
     path('v1/', include(router_v1.urls)),
 ]
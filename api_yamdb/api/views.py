@@ -1,25 +1,46 @@
-from django.core.mail import EmailMessage
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import (LimitOffsetPagination,
-                                       PageNumberPagination)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Categories, Genres, Review, Title
+from reviews.models import (Activity, Categories, Comment, Genres, Review,
+                            Title, Tombstone)
 from users.models import User
 from users.tokens import ConfirmationCodeTokenGenerator
 
+from . import autocomplete, lookups
+from .facets import get_facets
+from .fast_serializers import (CommentActivitySerializer,
+                               CommentChangeSerializer, CommentFastSerializer,
+                               ReviewActivitySerializer,
+                               ReviewChangeSerializer, ReviewFastSerializer,
+                               TitleChangeSerializer,
+                               TitleCommentFastSerializer, TitleFastSerializer,
+                               TitleReviewFastSerializer,
+                               TombstoneChangeSerializer)
+from .fieldsets import FIELDS_PARAM, get_query_list, is_requested
 from .filters import TitlesFilter
+from .mixins import (FastListMixin, IdempotencyMixin, NestedParentMixin,
+                     PublicCacheMixin)
+from .moderation import moderate, soft_delete
+from .pagination import (ActivityPagination, ChangeFeedPagination,
+                         EstimatedLimitOffsetPagination,
+                         EstimatedPageNumberPagination, FanInKeysetPagination)
 from .permissions import (IsAdmin, IsAdminUserOrReadOnly,
-                          IsAuthorOrReadOnlyPermission)
+                          IsAuthorOrReadOnlyPermission, IsModerator)
 from .serializers import (AdminSerializer, CategoriesSerializer,
                           CommentSerializer, ConfirmationCodeSerializer,
                           GenresSerializer, JwtTokenSerializer,
-                          ReviewSerializer, TitleListSerializer,
-                          TitleWriteSerializer, UserSerializer)
+                          ModerationSerializer, ReviewSerializer,
+                          TitleListSerializer, TitleWriteSerializer,
+                          UserSerializer)
+from .signups import get_recent_signup, remember_signup
+from .throttling import AuthEmailThrottle, AuthIPThrottle, AuthUsernameThrottle
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -31,7 +52,36 @@ class UserViewSet(viewsets.ModelViewSet):
     lookup_field = 'username'
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
-    pagination_class = PageNumberPagination
+    pagination_class = EstimatedPageNumberPagination
+
+    def list_authored(self, queryset, serializer):
+        """Keyset page of reviews or comments of the user from URL."""
+        user = get_object_or_404(User.objects.only('id'),
+                                 username=self.kwargs['username'])
+        page = self.paginate_queryset(
+            queryset.filter(author_id=user.id).values(
+                *serializer.get_lookups(),
+            ),
+        )
+        return self.get_paginated_response(
+            serializer.to_representation(page),
+        )
+
+    @action(methods=['get'], detail=True, permission_classes=(AllowAny,),
+            pagination_class=ActivityPagination)
+    def reviews(self, request, username=None):
+        return self.list_authored(Review.objects.filter(is_hidden=False),
+                                  TitleReviewFastSerializer())
+
+    @action(methods=['get'], detail=True, permission_classes=(AllowAny,),
+            pagination_class=ActivityPagination)
+    def comments(self, request, username=None):
+        return self.list_authored(
+            Comment.objects.filter(
+                is_hidden=False, review_id__is_hidden=False,
+            ).annotate(title_id=F('review_id__title_id')),
+            TitleCommentFastSerializer(),
+        )
 
     @action(
         methods=['get', 'patch'],
@@ -58,6 +108,11 @@ class AuthenticationViewSet(viewsets.GenericViewSet):
     """Viewset for registering and authenticating users."""
 
     permission_classes = (AllowAny,)
+    # No authentication, so throttled requests never reach the database.
+    authentication_classes = ()
+    throttle_classes = (
+        AuthIPThrottle, AuthUsernameThrottle, AuthEmailThrottle,
+    )
 
     def get_serializer_class(self):
         """Returns serializer class depending on which view is used."""
@@ -67,6 +122,9 @@ class AuthenticationViewSet(viewsets.GenericViewSet):
 
     def send_email(self, user: User):
         """Sends confirmation code to user."""
+        # Mail modules are only needed on signup, not at worker start.
+        from django.core.mail import EmailMessage
+
         token_generator = ConfirmationCodeTokenGenerator()
         subject = 'Код подтвеждения'
         body = '''
@@ -91,18 +149,22 @@ class AuthenticationViewSet(viewsets.GenericViewSet):
     def send_confirmation_code(self, request):
         """
         View for signing up new user. If user was already created
-        sends new email with confirmation code.
+        sends new email with confirmation code. Repeated requests
+        within SIGNUP_DEDUP_WINDOW get the same response without email.
         """
+        username = request.data.get('username')
+        email = request.data.get('email')
+        data = get_recent_signup(username, email)
+        if data is not None:
+            return Response(data=data, status=status.HTTP_200_OK)
         try:
-            user = User.objects.get(
-                username=request.data.get('username'),
-                email=request.data.get('email'),
-            )
+            user = User.objects.get(username=username, email=email)
         except User.DoesNotExist:
             pass
         else:
             self.send_email(user)
             data = {'email': user.email, 'username': user.username}
+            remember_signup(username, email, data)
             return Response(data=data, status=status.HTTP_200_OK)
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
@@ -112,6 +174,7 @@ class AuthenticationViewSet(viewsets.GenericViewSet):
                 username=username, email=email,
             )
             self.send_email(user)
+            remember_signup(username, email, serializer.data)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -130,15 +193,24 @@ class AuthenticationViewSet(viewsets.GenericViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(PublicCacheMixin, viewsets.ModelViewSet):
     queryset = Categories.objects.all()
     serializer_class = CategoriesSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
     lookup_field = 'slug'
-    pagination_class = LimitOffsetPagination
+    pagination_class = EstimatedLimitOffsetPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
 
+    def get_object(self):
+        """Unknown slugs are answered from the slug table."""
+        row = lookups.categories.get(self.kwargs['slug'])
+        if row is None:
+            raise Http404
+        category = get_object_or_404(self.get_queryset(), pk=row[0])
+        self.check_object_permissions(self.request, category)
+        return category
+
     def retrieve(self, request, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -146,17 +218,18 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class GenresViewSet(viewsets.ModelViewSet):
+class GenresViewSet(PublicCacheMixin, viewsets.ModelViewSet):
     queryset = Genres.objects.all()
     serializer_class = GenresSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
-    pagination_class = LimitOffsetPagination
+    pagination_class = EstimatedLimitOffsetPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name',)
 
     def destroy(self, request, **kwargs):
-        slug = self.kwargs.get('pk')
-        Genres.objects.filter(slug=slug).delete()
+        ids = lookups.genres.get_ids((self.kwargs.get('pk'),))
+        if ids:
+            Genres.objects.filter(pk__in=ids).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def retrieve(self, request, **kwargs):
@@ -166,56 +239,209 @@ class GenresViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class TitlesViewSet(PublicCacheMixin, FastListMixin, IdempotencyMixin,
+                    viewsets.ModelViewSet):
     permission_classes = (IsAdminUserOrReadOnly,)
-    queryset = Title.objects.all()
-    pagination_class = LimitOffsetPagination
+    pagination_class = EstimatedLimitOffsetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitlesFilter
+    fast_list_serializer_class = TitleFastSerializer
+
+    def get_queryset(self):
+        """Loads only columns and relations requested in ?fields=."""
+        queryset = Title.objects.all()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields = get_query_list(self.request, FIELDS_PARAM)
+        if is_requested('genre', fields):
+            queryset = queryset.prefetch_related('genre')
+        if is_requested('category', fields):
+            queryset = queryset.select_related('category')
+        if fields is None:
+            return queryset
+        return queryset.only(
+            'id',
+            *fields & {'name', 'year', 'description', 'rating', 'category'},
+        )
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleListSerializer
         return TitleWriteSerializer
 
-
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(methods=['get'], detail=False, pagination_class=None,
+            filter_backends=())
+    def autocomplete(self, request):
+        """Most reviewed titles whose names start with ?q=."""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+        return Response(autocomplete.index.search(
+            request.query_params.get('q', ''), limit,
+        ))
+
+    @action(methods=['get'], detail=False, pagination_class=None,
+            filter_backends=())
+    def facets(self, request):
+        """Genre, category and year counts for the title filters."""
+        return Response(get_facets(request.query_params))
+
+
+class ReviewViewSet(FastListMixin, IdempotencyMixin, NestedParentMixin,
+                    viewsets.ModelViewSet):
     """
     Api endpoint has access to SAFE_METHODS
     without registering.
     """
     serializer_class = ReviewSerializer
+    fast_list_serializer_class = ReviewFastSerializer
     permission_classes = (IsAuthorOrReadOnlyPermission,)
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+    child_model = Review
+    child_lookups = {'title_id': 'title_id'}
+    child_filters = {'is_hidden': False}
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        return title.review_title.all()
+        queryset = super().get_queryset()
+        if self.action == 'destroy':
+            return queryset
+        fields = get_query_list(self.request, FIELDS_PARAM)
+        if self.action not in ('list', 'retrieve') or fields is None:
+            return queryset.select_related('author')
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        return queryset.only(
+            'id', *fields & {'text', 'author', 'score', 'pub_date'},
+        )
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
-        serializer.save(title=title,
+        self.check_parent()
+        serializer.save(title_id=self.kwargs.get('title_id'),
                         author=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete(instance)
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(FastListMixin, IdempotencyMixin, NestedParentMixin,
+                     viewsets.ModelViewSet):
     """
     Api endpoint has access to SAFE_METHODS
     without registering.
     """
     serializer_class = CommentSerializer
+    fast_list_serializer_class = CommentFastSerializer
     permission_classes = (IsAuthorOrReadOnlyPermission,)
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    parent_filters = {'is_hidden': False}
+    child_model = Comment
+    child_lookups = {
+        'review_id': 'review_id', 'review_id__title_id': 'title_id',
+    }
+    child_filters = {'is_hidden': False, 'review_id__is_hidden': False}
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        review_id = self.kwargs.get("review_id")
-        review = Review.objects.get(pk=review_id,
-                                    title_id=title_id)
-        return review.review_comment.all()
+        queryset = super().get_queryset()
+        if self.action == 'destroy':
+            return queryset
+        return queryset.select_related('author')
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review_id = get_object_or_404(Review, pk=review_id)
-        serializer.save(review_id=review_id,
+        self.check_parent()
+        serializer.save(review_id_id=self.kwargs.get('review_id'),
                         author=self.request.user)
+
+    def perform_destroy(self, instance):
+        soft_delete(instance)
+
+
+class ChangesViewSet(viewsets.GenericViewSet):
+    """
+    Change feed for incremental sync. Returns titles, reviews, comments
+    or tombstones of deleted objects changed since ?updated_since= or
+    the cursor of the previous page, oldest first.
+    """
+
+    permission_classes = (AllowAny,)
+    pagination_class = ChangeFeedPagination
+    feeds = {
+        'titles': (TitleChangeSerializer, Title.objects.all()),
+        'reviews': (ReviewChangeSerializer, Review.objects.all()),
+        'comments': (CommentChangeSerializer, Comment.objects.all()),
+        'deleted': (TombstoneChangeSerializer, Tombstone.objects.all()),
+    }
+
+    def list(self, request, entity):
+        serializer_class, queryset = self.feeds[entity]
+        serializer = serializer_class()
+        page = self.paginate_queryset(serializer.get_queryset(queryset.all()))
+        return self.get_paginated_response(
+            serializer.to_representation(page),
+        )
+
+
+class ActivityViewSet(viewsets.GenericViewSet):
+    """
+    Latest reviews and comments of all titles, newest first. Pages are
+    merged from both tables or, with ACTIVITY_TABLE setting, read from
+    the precomputed activity table.
+    """
+
+    permission_classes = (AllowAny,)
+    activity_serializers = {
+        'review': ReviewActivitySerializer(),
+        'comment': CommentActivitySerializer(),
+    }
+
+    @property
+    def pagination_class(self):
+        if settings.ACTIVITY_TABLE:
+            return ActivityPagination
+        return FanInKeysetPagination
+
+    def get_page(self):
+        """Returns page of (kind, row) pairs."""
+        if settings.ACTIVITY_TABLE:
+            rows = self.paginate_queryset(Activity.objects.values(
+                'id', 'kind', 'object_id', 'text', 'author__username',
+                'score', 'pub_date', 'title_id', 'review_id',
+            ))
+            return [
+                (row['kind'], {**row, 'id': row['object_id']}) for row in rows
+            ]
+        serializers = self.activity_serializers
+        return self.paginate_queryset({
+            'review': Review.objects.filter(is_hidden=False).values(
+                *serializers['review'].get_lookups(),
+            ),
+            'comment': Comment.objects.filter(
+                is_hidden=False, review_id__is_hidden=False,
+            ).annotate(
+                title_id=F('review_id__title_id'),
+            ).values(*serializers['comment'].get_lookups()),
+        })
+
+    def list(self, request):
+        return self.get_paginated_response([
+            self.activity_serializers[kind].to_representation((row,))[0]
+            for kind, row in self.get_page()
+        ])
+
+
+class ModerationViewSet(viewsets.GenericViewSet):
+    """
+    Bulk delete or hide of reviews and comments selected by ids or
+    filters. Returns audit summary of the operation.
+    """
+
+    serializer_class = ModerationSerializer
+    permission_classes = (IsModerator,)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(moderate(request.user, **serializer.validated_data))
@@ -1,7 +1,27 @@
+"""
+ASGI config for YaMDb project.
+
+Title event streams are served by a native ASGI app, so idle
+connections do not hold worker threads. Other requests go to the
+Django WSGI application through a thread pool.
+"""
+
 import os
 
-from django.core.asgi import get_asgi_application
+from asgiref.wsgi import WsgiToAsgi
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+django_application = WsgiToAsgi(get_wsgi_application())
+
+from api.events import EVENTS_PATH, title_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        match = EVENTS_PATH.match(scope['path'])
+        if match:
+            return await title_events(scope, receive, send,
+                                      match['title_id'])
+    return await django_application(scope, receive, send)
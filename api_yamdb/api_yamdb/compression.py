@@ -0,0 +1,104 @@
+"""
+Response compression.
+
+Static files get precompressed ``.gz``/``.br`` siblings on collectstatic
+for nginx to serve directly, large JSON API responses are compressed
+on the fly.
+"""
+import re
+from gzip import GzipFile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_EXTENSIONS = (
+    '.css', '.js', '.map', '.html', '.svg', '.txt', '.json', '.xml',
+    '.ttf', '.eot',
+)
+ACCEPTS_BR = re.compile(r'\bbr\b')
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def gzip_compress(content, level):
+    buffer = BytesIO()
+    with GzipFile(mode='wb', compresslevel=level, fileobj=buffer,
+                  mtime=0) as gzip_file:
+        gzip_file.write(content)
+    return buffer.getvalue()
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    """Writes ``.gz`` and, with brotli installed, ``.br`` siblings."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            self.save_compressed(name + '.gz', content,
+                                 gzip_compress(content, 9))
+            if brotli is not None:
+                self.save_compressed(name + '.br', content,
+                                     brotli.compress(content))
+            yield name, name, True
+
+    def save_compressed(self, name, content, compressed):
+        """Saves compressed copy if it is smaller than the original."""
+        if self.exists(name):
+            self.delete(name)
+        if len(compressed) < len(content):
+            self._save(name, ContentFile(compressed))
+
+
+class CompressionMiddleware:
+    """
+    Compresses API responses larger than COMPRESSION_MIN_SIZE with
+    brotli or gzip, depending on Accept-Encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or not self.is_compressible(response)):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and ACCEPTS_BR.search(accept_encoding):
+            encoding = 'br'
+            compressed = brotli.compress(
+                response.content, quality=settings.COMPRESSION_BROTLI_QUALITY,
+            )
+        elif ACCEPTS_GZIP.search(accept_encoding):
+            encoding = 'gzip'
+            compressed = gzip_compress(response.content,
+                                       settings.COMPRESSION_GZIP_LEVEL)
+        else:
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^(W/)?', 'W/', response['ETag'])
+        return response
+
+    @staticmethod
+    def is_compressible(response):
+        content_type = response.get('Content-Type', '').split(';')[0]
+        return content_type in settings.COMPRESSION_CONTENT_TYPES
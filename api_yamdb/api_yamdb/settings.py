@@ -1,9 +1,11 @@
 import os
 from datetime import timedelta
 
-from dotenv import load_dotenv
+# Containers get their environment from env_file and skip the search.
+if os.getenv('LOAD_DOTENV', 'True') == 'True':
+    from dotenv import load_dotenv
 
-load_dotenv()
+    load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -31,6 +33,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api_yamdb.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,6 +75,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Refuse to start with a process-local cache, see api.apps.
+SHARED_CACHE_REQUIRED = os.getenv('SHARED_CACHE_REQUIRED', 'False') == 'True'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,6 +123,8 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+STATICFILES_STORAGE = 'api_yamdb.compression.CompressedStaticFilesStorage'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -121,10 +136,28 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': (
-        'rest_framework.pagination.PageNumberPagination'
+        'api.pagination.EstimatedPageNumberPagination'
     ),
     'PAGE_SIZE': 10,
+    # nginx replaces X-Forwarded-For with the client address.
+    'NUM_PROXIES': 1,
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': os.getenv('THROTTLE_AUTH_IP', '30/min'),
+        'auth_username': os.getenv('THROTTLE_AUTH_USERNAME', '10/hour'),
+        'auth_email': os.getenv('THROTTLE_AUTH_EMAIL', '5/hour'),
+    },
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
+JSON_COMPATIBILITY_MODE = os.getenv(
+    'JSON_COMPATIBILITY_MODE', 'True') == 'True'
 AUTH_USER_MODEL = 'users.User'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -134,6 +167,56 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
 }
 
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CONTENT_TYPES = ('application/json',)
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+SIGNUP_DEDUP_WINDOW = int(os.getenv('SIGNUP_DEDUP_WINDOW', 300))
+
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 5))
+CACHE_PURGE_URL = os.getenv('CACHE_PURGE_URL')
+CACHE_PURGE_TIMEOUT = 1
+
+FAST_LIST_SERIALIZATION = os.getenv(
+    'FAST_LIST_SERIALIZATION', 'True') == 'True'
+
+# 'postgres' bridges events between processes with LISTEN/NOTIFY,
+# 'memory' only delivers them within one process.
+EVENTS_BROKER = os.getenv('EVENTS_BROKER', (
+    'postgres' if 'postgresql' in DATABASES['default']['ENGINE']
+    else 'memory'
+))
+EVENTS_HEARTBEAT = 15
+EVENTS_QUEUE_SIZE = 100
+
+# Serve /activity/ from the precomputed activity table. Existing rows
+# are copied into it with manage.py rebuild_activity once it is on.
+ACTIVITY_TABLE = os.getenv('ACTIVITY_TABLE', 'False') == 'True'
+
+# Paginators use planner estimates instead of COUNT(*) above this size.
+ESTIMATED_COUNT_THRESHOLD = int(
+    os.getenv('ESTIMATED_COUNT_THRESHOLD', 10000))
+
+# Rows changed more recently are held back from the change feed.
+CHANGE_FEED_LAG = int(os.getenv('CHANGE_FEED_LAG', 2))
+
 REGEX_CATEGORY = r'^[-a-zA-Z0-9_]+$'
 
 EMPTY_VALUE_DISPLAY = '-пусто-'
+
+# manage.py archive_reviews moves reviews and comments deleted or hidden
+# longer ago than ARCHIVE_AFTER_DAYS into gzipped NDJSON files here.
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))
+
+# Seconds between catch-ups of the in-process title autocomplete index
+# with the change feed, and the largest number of suggestions.
+AUTOCOMPLETE_REFRESH = float(os.getenv('AUTOCOMPLETE_REFRESH', 1))
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Seconds facet counts of one filter combination are cached for.
+FACETS_CACHE_TIMEOUT = int(os.getenv('FACETS_CACHE_TIMEOUT', 60))
@@ -0,0 +1,39 @@
+"""
+Settings of API-only workers.
+
+Admin, sessions, messages, static files and djoser are not loaded, and
+the middleware stack is reduced to what JWT authenticated JSON requests
+use. Run the admin from a process with the default settings.
+"""
+from .settings import *  # noqa: F401, F403
+from .settings import REST_FRAMEWORK, TEMPLATES
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'django_filters',
+    'users.apps.UsersConfig',
+    'api.apps.ApiConfig',
+    'reviews.apps.ReviewsConfig',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'api_yamdb.compression.CompressionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'api_yamdb.urls_api'
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {'context_processors': [
+        'django.template.context_processors.request',
+    ]},
+}]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('api.renderers.FastJSONRenderer',),
+}
@@ -1,7 +1,32 @@
 from django.conf import settings
 from django.contrib import admin
+from django.db import connections
 
 from .models import Categories, Comment, Genres, Review, Title
+from .paginators import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist for tables with millions of rows: estimated counts and,
+    on PostgreSQL, text search through the full-text GIN index.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if (not search_term
+                or connections[queryset.db].vendor != 'postgresql'):
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        # Same expression as in the text search index of the table.
+        table = self.model._meta.db_table
+        return queryset.extra(
+            where=[f'to_tsvector(\'simple\', "{table}"."text") '
+                   f'@@ plainto_tsquery(\'simple\', %s)'],
+            params=[search_term],
+        ), False
 
 
 @admin.register(Title)
@@ -20,20 +45,26 @@ class TitleAdmin(admin.ModelAdmin):
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(LargeTableAdmin):
     """Custom admin panel for Review."""
 
     list_display = ('pk', 'title', 'text', 'author', 'score', 'pub_date')
+    list_select_related = ('title', 'author')
+    autocomplete_fields = ('title', 'author')
+    readonly_fields = ('is_hidden', 'deleted_at')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """Custom admin panel for comment."""
 
     list_display = ('pk', 'review_id', 'text', 'author', 'pub_date')
+    list_select_related = ('review_id', 'author')
+    autocomplete_fields = ('review_id', 'author')
+    readonly_fields = ('is_hidden', 'deleted_at')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
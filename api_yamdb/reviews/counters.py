@@ -0,0 +1,106 @@
+"""
+Denormalized review counters and ratings of titles and users.
+
+Single reviews and comments change counters incrementally, bulk
+operations recount affected rows with one UPDATE per table. Hidden
+reviews and comments, and comments of hidden reviews, are not
+counted.
+"""
+from django.db.models import (Avg, Count, ExpressionWrapper, F, FloatField,
+                              OuterRef, Subquery, Sum, Value)
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+from users.models import User
+
+from .models import Comment, Review, Title
+
+
+def aggregate(queryset, group, function, default=0):
+    """Correlated subquery of ``function`` over rows of outer object."""
+    rows = queryset.filter(**{group: OuterRef('pk')}).order_by()
+    value = Subquery(rows.values(group).annotate(
+        value=function,
+    ).values('value'))
+    if default is None:
+        return value
+    return Coalesce(value, default)
+
+
+def recount_titles(title_ids):
+    reviews = Review.objects.filter(is_hidden=False)
+    return Title.objects.filter(pk__in=title_ids).update(
+        review_count=aggregate(reviews, 'title', Count('pk')),
+        score_sum=aggregate(reviews, 'title', Sum('score')),
+        rating=aggregate(reviews, 'title', Avg('score'), default=None),
+        updated_at=timezone.now(),
+    )
+
+
+def count_comments():
+    comments = Comment.objects.filter(is_hidden=False,
+                                      review_id__is_hidden=False)
+    return aggregate(comments, 'author', Count('pk'))
+
+
+def recount_users(user_ids):
+    reviews = Review.objects.filter(is_hidden=False)
+    return User.objects.filter(pk__in=user_ids).update(
+        review_count=aggregate(reviews, 'author', Count('pk')),
+        score_sum=aggregate(reviews, 'author', Sum('score')),
+        comment_count=count_comments(),
+    )
+
+
+def recount_commenters(review_ids):
+    """Recounts comments of authors who commented on the reviews."""
+    return User.objects.filter(pk__in=get_commenters(review_ids)).update(
+        comment_count=count_comments(),
+    )
+
+
+def get_commenters(review_ids):
+    """Authors of visible comments of reviews, as a subquery."""
+    return Comment.objects.filter(
+        review_id__in=review_ids, is_hidden=False,
+    ).values('author_id')
+
+
+def add_review(review, sign=1):
+    """Adds (or with ``sign`` -1 removes) one review from counters."""
+    shift_review(review, sign, sign * review.score)
+
+
+def change_review(review, score, is_hidden):
+    """Moves counters of an edited review from old score and visibility."""
+    count = int(not review.is_hidden) - int(not is_hidden)
+    delta = (
+        (0 if review.is_hidden else review.score)
+        - (0 if is_hidden else score)
+    )
+    if count or delta:
+        shift_review(review, count, delta)
+
+
+def shift_review(review, count, score):
+    """Changes review counters of its title and author by F() deltas."""
+    Title.objects.filter(pk=review.title_id).update(
+        review_count=F('review_count') + count,
+        score_sum=F('score_sum') + score,
+        # Right-hand sides see values from before the update.
+        rating=ExpressionWrapper(
+            Cast(F('score_sum') + score, FloatField())
+            / NullIf(F('review_count') + count, Value(0)),
+            output_field=FloatField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    User.objects.filter(pk=review.author_id).update(
+        review_count=F('review_count') + count,
+        score_sum=F('score_sum') + score,
+    )
+
+
+def add_comment(comment, sign=1):
+    User.objects.filter(pk=comment.author_id).update(
+        comment_count=F('comment_count') + sign,
+    )
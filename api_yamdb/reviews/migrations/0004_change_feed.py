@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_auto_20220310_0529'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('title', 'title'), ('review', 'review'), ('comment', 'comment')], max_length=16, verbose_name='entity')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id of deleted object')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='deleted at')),
+            ],
+            options={
+                'db_table': 'tombstone',
+                'ordering': ('updated_at', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='last change'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='last change'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='last change'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_at', 'id'], name='comment_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['updated_at', 'id'], name='review_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['updated_at', 'id'], name='title_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['updated_at', 'id'], name='tombstone_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0004_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('review', 'review'), ('comment', 'comment')], max_length=16, verbose_name='kind')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id of review or comment')),
+                ('review_id', models.PositiveIntegerField(null=True, verbose_name='id of review')),
+                ('text', models.TextField(verbose_name='text')),
+                ('score', models.SmallIntegerField(null=True, verbose_name='score')),
+                ('pub_date', models.DateTimeField(verbose_name='date of publication')),
+            ],
+            options={
+                'db_table': 'activity',
+                'ordering': ('-pub_date', '-id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['pub_date', 'id'], name='comment_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['pub_date', 'id'], name='review_pub_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL, verbose_name='author'),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='reviews.Title', verbose_name='name of title'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['pub_date', 'id'], name='activity_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='activity',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_activity'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+
+    def aggregate(model, function):
+        rows = model.objects.filter(author=OuterRef('pk')).order_by()
+        return Coalesce(Subquery(rows.values('author').annotate(
+            value=function,
+        ).values('value')), 0)
+
+    User.objects.update(
+        review_count=aggregate(Review, Count('pk')),
+        score_sum=aggregate(Review, Sum('score')),
+        comment_count=aggregate(Comment, Count('pk')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_activity'),
+        ('users', '0002_activity_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='comment_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='review_author_pub_date_idx'),
+        ),
+    ]
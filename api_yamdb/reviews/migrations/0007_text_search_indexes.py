@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TABLES = {
+    'review_text_search_idx': 'review for title',
+    'comment_text_search_idx': 'comment on review',
+}
+
+
+def create_indexes(apps, schema_editor):
+    """GIN indexes for admin text search, PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in TABLES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+            f'ON "{table}" USING gin (to_tsvector(\'simple\', "text"))'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TABLES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently, outside of a transaction.
+    atomic = False
+
+    dependencies = [
+        ('reviews', '0006_author_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
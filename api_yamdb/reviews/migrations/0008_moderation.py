@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:29
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+
+    def aggregate(function):
+        rows = Review.objects.filter(title=OuterRef('pk')).order_by()
+        return Subquery(rows.values('title').annotate(
+            value=function,
+        ).values('value'))
+
+    Title.objects.update(
+        review_count=Coalesce(aggregate(Count('pk')), 0),
+        score_sum=Coalesce(aggregate(Sum('score')), 0),
+        rating=aggregate(Avg('score')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_text_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='hidden by moderator'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='is_hidden',
+            field=models.BooleanField(default=False, verbose_name='hidden by moderator'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(null=True, verbose_name='rating'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='reviews'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='sum of scores'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
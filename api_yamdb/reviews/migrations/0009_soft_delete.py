@@ -0,0 +1,63 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_moderation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_pub_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_author_pub_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_pub_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='review_author_pub_date_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='deleted at'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='deleted at'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['pub_date', 'id'], name='comment_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['author', 'pub_date', 'id'], name='comment_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['review_id', 'pub_date', 'id'], name='comment_review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['pub_date', 'id'], name='review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['author', 'pub_date', 'id'], name='review_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['title', 'pub_date', 'id'], name='review_title_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-19 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='review',
+            name='unique_score',
+        ),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(condition=models.Q(deleted_at=None), fields=('author', 'title'), name='unique_score'),
+        ),
+    ]
@@ -51,17 +51,34 @@ class Title(models.Model):
         related_name='category',
         null=True
     )
+    review_count = models.PositiveIntegerField('reviews', default=0)
+    score_sum = models.PositiveIntegerField('sum of scores', default=0)
+    rating = models.FloatField('rating', null=True)
+    updated_at = models.DateTimeField('last change', auto_now=True)
 
     class Meta:
         ordering = ('name',)
         db_table = 'title'
+        indexes = (
+            models.Index(fields=('updated_at', 'id'),
+                         name='title_updated_at_idx'),
+            # Range filters and ordering of the title list.
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year',), name='title_year_idx'),
+            models.Index(fields=('rating',), name='title_rating_idx'),
+            models.Index(fields=('review_count',),
+                         name='title_review_count_idx'),
+        )
 
     def __str__(self):
         return self.name
 
 
 class Review(models.Model):
-    """Reviews for titles."""
+    """
+    Reviews for titles. Deleted reviews stay hidden until archived, so
+    indexes of public lists only cover visible rows.
+    """
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -80,13 +97,31 @@ class Review(models.Model):
                     MinValueValidator(1, 'Value more or equal 1')]
     )
     pub_date = models.DateTimeField('year of writing', auto_now_add=True)
+    is_hidden = models.BooleanField('hidden by moderator', default=False)
+    deleted_at = models.DateTimeField('deleted at', null=True, blank=True)
+    updated_at = models.DateTimeField('last change', auto_now=True)
 
     class Meta:
         ordering = ('pub_date',)
         db_table = 'review for title'
         constraints = (
+            # Authors can review again after deleting their review.
             models.UniqueConstraint(fields=('author', 'title'),
-                                    name='unique_score'),
+                                    name='unique_score',
+                                    condition=models.Q(deleted_at=None)),
+        )
+        indexes = (
+            models.Index(fields=('updated_at', 'id'),
+                         name='review_updated_at_idx'),
+            models.Index(fields=('pub_date', 'id'),
+                         name='review_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='review_author_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
+            models.Index(fields=('title', 'pub_date', 'id'),
+                         name='review_title_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
         )
 
     def __str__(self):
@@ -94,7 +129,7 @@ class Review(models.Model):
 
 
 class Comment(models.Model):
-    """Comments on reviews."""
+    """Comments on reviews, deleted the same way as reviews."""
     review_id = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
@@ -108,10 +143,93 @@ class Comment(models.Model):
         verbose_name='author',
         related_name='author_comment')
     pub_date = models.DateTimeField('year of writing', auto_now_add=True)
+    is_hidden = models.BooleanField('hidden by moderator', default=False)
+    deleted_at = models.DateTimeField('deleted at', null=True, blank=True)
+    updated_at = models.DateTimeField('last change', auto_now=True)
 
     class Meta:
         ordering = ('pub_date',)
         db_table = 'comment on review'
+        indexes = (
+            models.Index(fields=('updated_at', 'id'),
+                         name='comment_updated_at_idx'),
+            models.Index(fields=('pub_date', 'id'),
+                         name='comment_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
+            models.Index(fields=('author', 'pub_date', 'id'),
+                         name='comment_author_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
+            models.Index(fields=('review_id', 'pub_date', 'id'),
+                         name='comment_review_pub_date_idx',
+                         condition=models.Q(is_hidden=False)),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+
+class Tombstone(models.Model):
+    """Deleted titles, reviews and comments for the change feed."""
+    ENTITIES = (
+        ('title', 'title'),
+        ('review', 'review'),
+        ('comment', 'comment'),
+    )
+    entity = models.CharField('entity', max_length=16, choices=ENTITIES)
+    object_id = models.PositiveIntegerField('id of deleted object')
+    updated_at = models.DateTimeField('deleted at', auto_now=True)
+
+    class Meta:
+        ordering = ('updated_at', 'id')
+        db_table = 'tombstone'
+        indexes = (
+            models.Index(fields=('updated_at', 'id'),
+                         name='tombstone_updated_at_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.entity} {self.object_id}'
+
+
+class Activity(models.Model):
+    """
+    Reviews and comments in one table for the activity feed. Filled
+    when ACTIVITY_TABLE setting is on.
+    """
+    KINDS = (
+        ('review', 'review'),
+        ('comment', 'comment'),
+    )
+    kind = models.CharField('kind', max_length=16, choices=KINDS)
+    object_id = models.PositiveIntegerField('id of review or comment')
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        verbose_name='name of title',
+        related_name='activity',
+    )
+    review_id = models.PositiveIntegerField('id of review', null=True)
+    text = models.TextField('text')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='author',
+        related_name='activity',
+    )
+    score = models.SmallIntegerField('score', null=True)
+    pub_date = models.DateTimeField('date of publication')
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        db_table = 'activity'
+        constraints = (
+            models.UniqueConstraint(fields=('kind', 'object_id'),
+                                    name='unique_activity'),
+        )
+        indexes = (
+            models.Index(fields=('pub_date', 'id'),
+                         name='activity_pub_date_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
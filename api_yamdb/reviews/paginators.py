@@ -0,0 +1,101 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def estimate_count(queryset):
+    """
+    Returns planner row estimate for queryset on PostgreSQL, None on
+    other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    # QuerySet.explain() joins result columns with str(), which turns
+    # the decoded JSON into a Python repr.
+    sql, params = queryset.order_by().query.get_compiler(
+        queryset.db,
+    ).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return get_plan_rows(cursor.fetchone()[0])
+
+
+def get_plan_rows(plan):
+    """Top node row estimate of EXPLAIN (FORMAT JSON) output."""
+    if isinstance(plan, str):
+        # psycopg2 decodes json columns, other drivers may not.
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_count(queryset):
+    """
+    Returns count and whether it is an estimate. Planner estimate is
+    used when it is above ESTIMATED_COUNT_THRESHOLD.
+    """
+    estimate = None
+    if hasattr(queryset, 'explain'):
+        estimate = estimate_count(queryset)
+    if estimate is None or estimate < settings.ESTIMATED_COUNT_THRESHOLD:
+        return Paginator(queryset, 1).count, False
+    return estimate, True
+
+
+class EstimatedPage(Page):
+    """Page whose next page is known from one extra fetched row."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.next_exists = has_next
+
+    def has_next(self):
+        return self.next_exists
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses planner estimate instead of COUNT(*) when it is above
+    ESTIMATED_COUNT_THRESHOLD. Exact count is used below it.
+
+    With an estimate, page numbers are not checked against num_pages:
+    a page exists if it has rows, and the next one if a row past the
+    page was fetched.
+    """
+
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        count, self.count_is_estimate = get_count(self.object_list)
+        return count
+
+    def page(self, number):
+        if not self.count or not self.count_is_estimate:
+            return super().page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        # Shown pages must stay reachable when the estimate is too low.
+        self.count = max(self.count, bottom + len(rows) + has_next)
+        self.__dict__.pop('num_pages', None)
+        return EstimatedPage(rows, number, self, has_next)
@@ -0,0 +1,90 @@
+"""
+Optional PostgreSQL hash partitioning of reviews and comments.
+
+Reviews are partitioned by title, comments by review, so lists of one
+title or review touch a single partition. Partitioned tables need the
+partition key in every unique index: the primary key becomes
+``(id, key)`` and ``unique_score`` already includes the title. The
+foreign key from comments to reviews cannot reference ``id`` alone and
+is dropped, deletes of reviews cascade in Django as before.
+
+Models are unchanged, ``id`` stays their primary key for Django.
+"""
+from .models import Comment, Review
+
+PARTITION_KEYS = (
+    # Comments first: their foreign key goes away with the review table.
+    (Comment, 'review_id_id'),
+    (Review, 'title_id'),
+)
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            (table,),
+        )
+        return cursor.fetchone() is not None
+
+
+def get_index_definitions(connection, table):
+    """CREATE INDEX statements of ``table`` except the primary key."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.indexdef FROM pg_indexes i '
+            'JOIN pg_class c ON c.relname = i.indexname '
+            'JOIN pg_index x ON x.indexrelid = c.oid '
+            'WHERE i.tablename = %s AND NOT x.indisprimary',
+            (table,),
+        )
+        return [definition for definition, in cursor.fetchall()]
+
+
+def get_partition_sql(schema_editor, model, key, partitions):
+    """
+    Statements replacing the table of ``model`` with ``partitions``
+    hash partitions by ``key``, keeping data, indexes, constraints
+    and the id sequence. Run them in one transaction.
+    """
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    heap = f'{table}_heap'
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)',
+                       (quote(table), 'id'))
+        sequence, = cursor.fetchone()
+    # Read before the rename, so they point at the new table. Names
+    # are free again once the old table is dropped.
+    indexes = get_index_definitions(connection, table)
+    statements = [
+        f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE {quote(table)} RENAME TO {quote(heap)}',
+        f'CREATE TABLE {quote(table)} (LIKE {quote(heap)} INCLUDING '
+        f'DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY HASH ({quote(key)})',
+    ]
+    statements.extend(
+        f'CREATE TABLE {quote(f"{table}_p{remainder}")} PARTITION OF '
+        f'{quote(table)} FOR VALUES WITH (MODULUS {partitions}, '
+        f'REMAINDER {remainder})'
+        for remainder in range(partitions)
+    )
+    statements += [
+        f'INSERT INTO {quote(table)} SELECT * FROM {quote(heap)}',
+        f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.{quote("id")}',
+        f'DROP TABLE {quote(heap)} CASCADE',
+        f'ALTER TABLE {quote(table)} ADD PRIMARY KEY '
+        f'({quote("id")}, {quote(key)})',
+    ]
+    statements.extend(indexes)
+    statements.extend(
+        str(schema_editor._create_fk_sql(
+            model, field, '_fk_%(to_table)s_%(to_column)s',
+        ))
+        for field in model._meta.local_fields
+        if field.remote_field and field.db_constraint
+        and field.related_model not in (Review, Comment)
+    )
+    return statements
@@ -0,0 +1,157 @@
+from django.conf import settings
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .counters import (add_comment, add_review, change_review,
+                       recount_commenters, recount_titles, recount_users)
+from .models import (Activity, Categories, Comment, Genres, Review, Title,
+                     Tombstone)
+
+COUNTED_FIELDS = {'score', 'is_hidden'}
+
+
+def touch_titles(titles):
+    """Marks titles as changed for the change feed."""
+    titles.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(entity=sender._meta.model_name,
+                             object_id=instance.pk)
+
+
+@receiver(post_save, sender=Categories)
+@receiver(pre_delete, sender=Categories)
+def touch_category_titles(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        touch_titles(Title.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Genres)
+@receiver(pre_delete, sender=Genres)
+def touch_genre_titles(sender, instance, **kwargs):
+    if not kwargs.get('created'):
+        touch_titles(Title.objects.filter(genre=instance))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_titles(Title.objects.filter(pk=instance.pk))
+    elif action in ('post_add', 'post_remove'):
+        touch_titles(Title.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        touch_titles(Title.objects.filter(genre=instance))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def save_activity(sender, instance, created, **kwargs):
+    if not settings.ACTIVITY_TABLE:
+        return
+    kind = sender._meta.model_name
+    if instance.is_hidden:
+        Activity.objects.filter(kind=kind, object_id=instance.pk).delete()
+        if sender is Review:
+            Activity.objects.filter(kind='comment',
+                                    review_id=instance.pk).delete()
+    elif not created:
+        Activity.objects.filter(kind=kind, object_id=instance.pk).update(
+            text=instance.text, score=getattr(instance, 'score', None),
+        )
+    elif sender is Review:
+        Activity.objects.create(
+            kind=kind, object_id=instance.pk, title_id=instance.title_id,
+            text=instance.text, author_id=instance.author_id,
+            score=instance.score, pub_date=instance.pub_date,
+        )
+    else:
+        # Django 2.2 cannot insert a subquery, the title is read first.
+        title_id = Review.objects.values_list('title_id', flat=True).get(
+            pk=instance.review_id_id,
+        )
+        Activity.objects.create(
+            kind=kind, object_id=instance.pk, title_id=title_id,
+            review_id=instance.review_id_id, text=instance.text,
+            author_id=instance.author_id, pub_date=instance.pub_date,
+        )
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def delete_activity(sender, instance, **kwargs):
+    if settings.ACTIVITY_TABLE:
+        Activity.objects.filter(kind=sender._meta.model_name,
+                                object_id=instance.pk).delete()
+
+
+@receiver(pre_save, sender=Review)
+def remember_counted(sender, instance, update_fields=None, **kwargs):
+    """Keeps score and visibility from before an edit for count_review."""
+    if instance._state.adding:
+        return
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        instance.counted_before = (instance.score, instance.is_hidden)
+        return
+    rows = sender.objects.filter(pk=instance.pk).order_by().values_list(
+        'score', 'is_hidden',
+    )
+    instance.counted_before = next(iter(rows), None)
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, **kwargs):
+    if created:
+        if not instance.is_hidden:
+            add_review(instance)
+        return
+    before = instance.__dict__.pop('counted_before', None)
+    if before is None:
+        # Nothing to compare with, the row was gone before the save.
+        recount_titles((instance.title_id,))
+        recount_users((instance.author_id,))
+        return
+    score, is_hidden = before
+    change_review(instance, score, is_hidden)
+    if is_hidden != instance.is_hidden:
+        # Comments are only counted under visible reviews.
+        recount_commenters((instance.pk,))
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    if not instance.is_hidden:
+        add_review(instance, sign=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    # Visibility is changed by moderation, which recounts itself.
+    if created and not instance.is_hidden:
+        add_comment(instance)
+
+
+@receiver(pre_delete, sender=Comment)
+def remember_comment_counted(sender, instance, **kwargs):
+    """Comments under hidden reviews are not counted, see counters."""
+    if instance.is_hidden:
+        instance.counted = False
+    elif sender.review_id.is_cached(instance):
+        instance.counted = not instance.review_id.is_hidden
+    else:
+        # Cascades delete comments before their reviews, so it is there.
+        instance.counted = Review.objects.filter(
+            pk=instance.review_id_id, is_hidden=False,
+        ).exists()
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.__dict__.pop('counted', False):
+        add_comment(instance, sign=-1)
@@ -14,6 +14,6 @@ class UserAdmin(admin.ModelAdmin):
         'bio',
         'role',
     )
-    search_fields = ('first_name', 'email')
+    search_fields = ('username', 'first_name', 'email')
     list_filter = ('role',)
     empty_value_display = settings.EMPTY_VALUE_DISPLAY
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='комментариев'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='отзывов'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='сумма оценок'),
+        ),
+    ]
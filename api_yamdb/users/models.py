@@ -29,6 +29,16 @@ class User(AbstractUser):
         default=USER,
         max_length=9,
     )
+    review_count = models.PositiveIntegerField('отзывов', default=0)
+    comment_count = models.PositiveIntegerField('комментариев', default=0)
+    score_sum = models.PositiveIntegerField('сумма оценок', default=0)
+
+    @property
+    def average_score(self):
+        """Average score given in reviews, from counters."""
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
 
     def __str__(self) -> str:
         return self.username